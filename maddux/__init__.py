@@ -4,3 +4,5 @@ import plot
 import utils
 import examples
 from environment import Environment
+from sdf import SignedDistanceField
+from events import Event, EventQueue
@@ -5,9 +5,16 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import matplotlib.animation as animation
+from maddux.objects import Obstacle, ObstacleSet
+from maddux.objects.throwable import ThrowableObject
+from maddux.objects.dynamic_array import DynamicObjectArray
+from maddux.objects import ballistics
+from maddux.events import Event, EventQueue, IMPACT, RELEASE, WAYPOINT
+from maddux.integrators import VelocityVerlet
 
 
 GRAVITY = -9.81
+TIME = 0.001
 
 
 class Environment:
@@ -38,21 +45,403 @@ class Environment:
         self.dynamic_objects = dynamic_objects if dynamic_objects else []
         self.static_objects = static_objects if static_objects else []
         self.robot = robot
+        self.update_obstacles()
 
-    def run(self, duration):
-        """Run for a certain duration
+        # Simulation time in seconds, and the events scheduled to happen
+        self.time = 0.0
+        self.scheduled = EventQueue()
+        self.throwables = DynamicObjectArray()
+        self.update_dynamic_objects()
+
+    def update_obstacles(self):
+        """Rebuild the obstacle set from static_objects. Changes made to
+        static_objects directly rather than through add_static_object and
+        remove_static_object are picked up by the next query anyway.
+
+        :rtype: None
+        """
+        self._static_objects = list(self.static_objects)
+        self.obstacles = ObstacleSet([static for static in self.static_objects
+                                      if isinstance(static, Obstacle)],
+                                     self.dimensions)
+        self.other_static_objects = [static for static in self.static_objects
+                                     if not isinstance(static, Obstacle)]
+
+    def _sync_static_objects(self):
+        """Rebuild the obstacle set if static_objects was changed
+        directly since it was last built"""
+        if self.static_objects != self._static_objects:
+            self.update_obstacles()
+
+    def update_dynamic_objects(self):
+        """Rebuild the array of throwable objects from dynamic_objects.
+        Changes made to dynamic_objects directly rather than through
+        add_dynamic_object and remove_dynamic_object are picked up by the
+        next step or collision check anyway.
+
+        :rtype: None
+        """
+        # Give objects no longer in the environment their state back, and
+        # keep however the old array was set up to step
+        old = self.throwables
+        old.discard(list(old))
+        self._dynamic_objects = list(self.dynamic_objects)
+        self.throwables = DynamicObjectArray(
+            [dynamic for dynamic in self.dynamic_objects
+             if isinstance(dynamic, ThrowableObject)],
+            old.flush_every, old.integrator)
+        self.other_dynamic_objects = [
+            dynamic for dynamic in self.dynamic_objects
+            if not isinstance(dynamic, ThrowableObject)]
+
+    def _sync_dynamic_objects(self):
+        """Rebuild the array of throwable objects if dynamic_objects was
+        changed directly since it was last built"""
+        if self.dynamic_objects != self._dynamic_objects:
+            self.update_dynamic_objects()
+
+    def add_dynamic_object(self, dynamic):
+        """Add a dynamic object to the environment
+
+        :param dynamic: The object to add
+        :type dynamic: maddux.objects.DynamicObject
+
+        :rtype: None
+        """
+        self._sync_dynamic_objects()
+        self.dynamic_objects.append(dynamic)
+        self._dynamic_objects.append(dynamic)
+        if isinstance(dynamic, ThrowableObject):
+            self.throwables.add(dynamic)
+        else:
+            self.other_dynamic_objects.append(dynamic)
+
+    def remove_dynamic_object(self, dynamic):
+        """Remove a dynamic object from the environment
+
+        :param dynamic: The object to remove
+        :type dynamic: maddux.objects.DynamicObject
+
+        :rtype: None
+        """
+        self._sync_dynamic_objects()
+        self.dynamic_objects.remove(dynamic)
+        self._dynamic_objects.remove(dynamic)
+        if isinstance(dynamic, ThrowableObject):
+            self.throwables.remove(dynamic)
+        else:
+            self.other_dynamic_objects.remove(dynamic)
+
+    def step(self):
+        """Step every dynamic object forward one ms
+
+        :rtype: None
+        """
+        self._sync_dynamic_objects()
+        self._step()
+
+    def _step(self):
+        """step without checking dynamic_objects for changes"""
+        self.throwables.step()
+        map(lambda obj: obj.step(), self.other_dynamic_objects)
+
+    def add_static_object(self, static):
+        """Add a static object to the environment
+
+        :param static: The object to add
+        :type static: maddux.objects.StaticObject
+
+        :rtype: None
+        """
+        self._sync_static_objects()
+        self.static_objects.append(static)
+        self._static_objects.append(static)
+        if isinstance(static, Obstacle):
+            self.obstacles.add(static)
+        else:
+            self.other_static_objects.append(static)
+
+    def remove_static_object(self, static):
+        """Remove a static object from the environment
+
+        :param static: The object to remove
+        :type static: maddux.objects.StaticObject
+
+        :rtype: None
+        """
+        self._sync_static_objects()
+        self.static_objects.remove(static)
+        self._static_objects.remove(static)
+        if isinstance(static, Obstacle):
+            self.obstacles.remove(static)
+        else:
+            self.other_static_objects.remove(static)
+
+    def schedule_release(self, time, object_idx=None):
+        """Have the robot release one or all of its held objects at a
+        given simulation time
+
+        :param time: Simulation time in seconds
+        :type time: float
+
+        :param object_idx: (Optional) index of the held object to release
+        :type object_idx: int or None
+
+        :rtype: None
+        """
+        if self.robot is None:
+            raise ValueError("Releases need a robot in the environment")
+        self.scheduled.push(Event(time, RELEASE, data=object_idx))
+
+    def schedule_waypoint(self, time, q):
+        """Have the robot reach a waypoint at a given simulation time. The
+        arm (and anything it holds) moves to the waypoint at that time.
+
+        :param time: Simulation time in seconds
+        :type time: float
+
+        :param q: The joint angles of the waypoint
+        :type q: numpy.ndarray
+
+        :rtype: None
+        """
+        if self.robot is None:
+            raise ValueError("Waypoints need a robot in the environment")
+        self.scheduled.push(Event(time, WAYPOINT, data=np.array(q)))
+
+    def run(self, duration, analytic=False, sample_step=None,
+            stop_at_collision=True, max_step=None):
+        """Run for a certain duration, by default stopping at the first
+        collision. Scheduled releases and waypoints happen along the way,
+        and time where nothing moves is skipped over.
 
         :param duration: duration to run environment in seconds
         :type duration: integer
 
-        :rtype: None
+        :param analytic: (Default: False) Rather than stepping every ms,
+                         move thrown objects along their exact paths
+                         straight from one event to the next. Every free
+                         dynamic object must be a ThrowableObject.
+        :type analytic: bool
+
+        :param sample_step: (Optional) In analytic mode, time between the
+                            positions recorded along each path. Only the
+                            positions at events are recorded otherwise.
+        :type sample_step: float or None
+
+        :param stop_at_collision: (Default: True) Whether to stop at the
+                                  first collision or keep going until the
+                                  duration is up
+        :type stop_at_collision: bool
+
+        :param max_step: (Optional) Rather than stepping every ms, take
+                         steps of up to max_step seconds, shrinking them
+                         back down to one ms wherever a step could reach
+                         a wall or static object. Steps use the
+                         throwables' integrator if one was set, or
+                         velocity Verlet (exact under gravity) otherwise.
+                         Every free dynamic object must be a
+                         ThrowableObject.
+        :type max_step: float or None
+
+        :returns: The impacts, releases and waypoints that happened, in
+                  order
+        :rtype: list of maddux.events.Event
         """
+        self._sync_dynamic_objects()
+        if analytic:
+            return self._run_analytic(duration, sample_step,
+                                      stop_at_collision)
+        if max_step is not None:
+            return self._run_adaptive(duration, max_step, stop_at_collision)
+
+        start = self.time
         duration_ms = int(duration * 1000)
+        events = []
+
+        k = 0
+        while k < duration_ms:
+            self.time = start + k * TIME
+            events.extend(self._fire_scheduled(self.time))
+
+            if not self._is_moving():
+                # Nothing changes until the next scheduled event
+                wait = self.scheduled.next_time() - start
+                if wait == float('inf'):
+                    k = duration_ms
+                else:
+                    k = min(duration_ms, int(np.ceil(wait / TIME - 1e-9)))
+                continue
 
-        for _ in xrange(duration_ms):
-            map(lambda obj: obj.step(), self.dynamic_objects)
-            if self.collision():
+            self._step()
+            k += 1
+            hit = self._collide()
+            if hit is not None:
+                events.append(Event(start + k * TIME, IMPACT, hit))
+                if stop_at_collision:
+                    self.time = start + k * TIME
+                    return events
+
+        self.time = start + duration_ms * TIME
+        events.extend(self._fire_scheduled(self.time))
+        return events
+
+    def _run_analytic(self, duration, sample_step, stop_at_collision):
+        """run in analytic mode"""
+        end = self.time + duration
+        events = []
+
+        while True:
+            free = [dynamic for dynamic in self.dynamic_objects
+                    if not dynamic.attached]
+            for dynamic in free:
+                if not isinstance(dynamic, ThrowableObject):
+                    raise ValueError("Analytic mode needs throwable objects")
+
+            # Jump straight to whichever comes first: an impact, a
+            # scheduled event or the end of the run
+            impacts = [self.time + self.time_of_impact(dynamic)
+                       for dynamic in free]
+            first = int(np.argmin(impacts)) if free else None
+            t = min([end, self.scheduled.next_time()] + impacts)
+
+            if t > self.time:
+                for dynamic in free:
+                    dynamic.advance(t - self.time, sample_step)
+                self.time = t
+
+            if free and impacts[first] <= t:
+                free[first].attach()
+                events.append(Event(t, IMPACT, free[first]))
+                if stop_at_collision:
+                    break
+            elif self.scheduled.next_time() <= t:
+                events.extend(self._fire(self.scheduled.pop()))
+            else:
                 break
+        return events
+
+    def _run_adaptive(self, duration, max_step, stop_at_collision):
+        """run with adaptive steps"""
+        if any(not dynamic.attached
+               for dynamic in self.other_dynamic_objects):
+            raise ValueError("Adaptive steps need throwable objects")
+
+        # Semi-implicit Euler bends the path on long steps, while velocity
+        # Verlet is exact under constant gravity
+        integrator = self.throwables.integrator
+        if integrator is None:
+            integrator = VelocityVerlet()
+
+        end = self.time + duration
+        events = []
+        h = max_step
+        while self.time < end:
+            events.extend(self._fire_scheduled(self.time))
+            next_time = min(end, self.scheduled.next_time())
+            if not self._is_moving():
+                # Nothing changes until the next scheduled event
+                self.time = next_time
+                continue
+
+            h = min(h, next_time - self.time)
+            positions, velocities = self.throwables.integrate(
+                h, integrator=integrator)
+            free = ~self.throwables.attached
+            if h > TIME and self._sweep_hits(self.throwables.positions[free],
+                                             positions[free], h):
+                # Something may be hit during this step, so close in on it
+                h = max(TIME, 0.5 * h)
+                continue
+
+            self.throwables.update(positions, velocities)
+            if h == next_time - self.time:
+                self.time = next_time
+            else:
+                self.time += h
+            h = min(max_step, 2 * h)
+
+            hit = self._collide()
+            if hit is not None:
+                events.append(Event(self.time, IMPACT, hit))
+                if stop_at_collision:
+                    return events
+
+        events.extend(self._fire_scheduled(self.time))
+        return events
+
+    def _sweep_hits(self, starts, ends, h):
+        """Whether a step of h seconds from starts to ends may hit a wall
+        or static object on the way. The real path is a parabola bowing up
+        to |g| h^2 / 8 away from the straight chord, so the chord is
+        grown by that much."""
+        self._sync_static_objects()
+        bow = abs(GRAVITY) * h * h / 8.0
+        lo = np.minimum(starts, ends)
+        hi = np.maximum(starts, ends)
+        lo[:, 2] -= bow
+        hi[:, 2] += bow
+        if np.any(lo <= 0) or np.any(hi >= self.dimensions):
+            return True
+        if np.any(self.obstacles.capsule_distances(starts, ends, bow) <= 0):
+            return True
+        return any(np.any(static.is_hit_by_capsules(starts, ends, bow))
+                   for static in self.other_static_objects)
+
+    def _fire_scheduled(self, time):
+        """Fire every scheduled event due by a given time"""
+        events = []
+        while self.scheduled.next_time() <= time + 1e-9:
+            events.extend(self._fire(self.scheduled.pop()))
+        return events
+
+    def _fire(self, event):
+        """Make a scheduled event happen, returning what happened"""
+        event.time = max(event.time, self.time)
+        if event.kind == WAYPOINT:
+            self.robot.update_angles(event.data, save=True)
+            return [event]
+
+        if event.data is None:
+            released = list(self.robot.held_objects)
+        else:
+            released = [self.robot.held_objects[event.data]]
+        self.robot.release(event.data)
+        return [Event(event.time, RELEASE, obj) for obj in released]
+
+    def is_moving(self):
+        """Whether any dynamic object is free to move
+
+        :rtype: bool
+        """
+        self._sync_dynamic_objects()
+        return self._is_moving()
+
+    def _is_moving(self):
+        """is_moving without checking dynamic_objects for changes"""
+        return (not self.throwables.attached.all() or
+                any(not dynamic.attached
+                    for dynamic in self.other_dynamic_objects))
+
+    def time_of_impact(self, dynamic):
+        """Earliest time a thrown object hits a wall or static object
+
+        :param dynamic: The thrown object
+        :type dynamic: maddux.objects.ThrowableObject
+
+        :returns: The time in seconds, or inf if it never hits anything
+        :rtype: float
+        """
+        self._sync_static_objects()
+        position = np.array(dynamic.position, dtype=float)
+        velocity = np.array(dynamic.velocity, dtype=float)
+
+        t = ballistics.room_exit_time(position, velocity, self.dimensions,
+                                      GRAVITY)
+        t = min(t, self.obstacles.time_of_impact(position, velocity, GRAVITY))
+        for static in self.other_static_objects:
+            t = min(t, static.time_of_impact(position, velocity, GRAVITY))
+        return t
 
     def animate(self, duration=None, save_path=None):
         """Animates the running of the program
@@ -80,7 +469,7 @@ class Environment:
         def update(i):
             ax.clear()
             for _ in xrange(dynamic_iter_per_frame):
-                map(lambda obj: obj.step(), self.dynamic_objects)
+                self.step()
                 # Check for collisions
                 self.collision()
             if self.robot is not None:
@@ -111,27 +500,24 @@ class Environment:
                   thrown object based on end effector velocity.
         :rtype: numpy.ndarray or None
         """
-        pos = self.robot.end_effector_position().copy()
+        pos = np.array(self.robot.end_effector_position(), dtype=float)
         # Only need linear velocity
         v = self.robot.end_effector_velocity()[0:3]
 
-        for t in np.linspace(0, 15, 5000):
-            # Check if it hit a target
-            for static in self.static_objects:
-                if static.is_hit(pos):
-                    return pos.copy()
-
-            # Or a wall
-            for i in range(len(pos)):
-                in_negative_space = pos[i] <= 0
-                past_boundary = pos[i] >= self.dimensions[i]
-
-                if in_negative_space or past_boundary:
-                    return pos.copy()
-
-            # Otherwise step forward
-            v[2] += t * GRAVITY
-            pos += t * v
+        # Lay out every step of the flight at once: step k checks the
+        # position, adds t_k * GRAVITY to the vertical velocity and then
+        # moves by t_k times the new velocity
+        ts = np.linspace(0, 15, 5000)
+        velocities = np.tile(v, (len(ts) - 1, 1))
+        velocities[:, 2] += GRAVITY * np.cumsum(ts[:-1])
+        path = np.empty((len(ts), 3))
+        path[0] = pos
+        path[1:] = pos + np.cumsum(ts[:-1, np.newaxis] * velocities, axis=0)
+
+        # Find the first step that hits anything
+        hits = self.hits(path)
+        if np.any(hits):
+            return path[np.argmax(hits)].copy()
         # If we never hit anything (which is completely impossible (TM))
         # return None
         return None
@@ -143,24 +529,50 @@ class Environment:
         :return: Whether there was a collision
         :rtype: bool
         """
+        self._sync_dynamic_objects()
+        return self._collide() is not None
+
+    def _collide(self):
+        """Attach the first free object that hit something, returning it
+        (or None)"""
+        # Check every free throwable at once straight from the arrays
+        free = ~self.throwables.attached
+        others = [dynamic for dynamic in self.other_dynamic_objects
+                  if not dynamic.attached]
+        if not free.any() and not others:
+            return None
+
+        points = self.throwables.positions[free]
+        if others:
+            points = np.vstack([points] +
+                               [dynamic.position for dynamic in others])
+        if not np.any(self.hits(points)):
+            return None
+
+        # Attach the first colliding object in dynamic_objects order
         for dynamic in self.dynamic_objects:
-            if dynamic.attached:
-                continue
+            if not dynamic.attached and self.hits([dynamic.position])[0]:
+                dynamic.attach()
+                return dynamic
+        return None
 
-            for static in self.static_objects:
-                if static.is_hit(dynamic.position):
-                    dynamic.attach()
-                    return True
+    def hits(self, points):
+        """Check which of many points (e.g. the steps of a trajectory)
+        hit a static object or a wall
 
-            for i in range(len(dynamic.position)):
-                in_negative_space = dynamic.position[i] <= 0
-                past_boundary = (dynamic.position[i] >=
-                                 self.dimensions[i])
-                if in_negative_space or past_boundary:
-                    dynamic.attach()
-                    return True
+        :param points: Mx3 points
+        :type points: numpy.ndarray
 
-        return False
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        self._sync_static_objects()
+        points = np.asarray(points, dtype=float)
+        hits = np.any((points <= 0) | (points >= self.dimensions), axis=1)
+        hits |= self.obstacles.are_hit(points)
+        for static in self.other_static_objects:
+            hits |= static.are_hit(points)
+        return hits
 
     def plot(self, ax=None, show=True):
         """Plot throw trajectory and ball
@@ -0,0 +1,84 @@
+"""
+Events that happen during a simulation, and a queue of the ones scheduled
+to happen later.
+"""
+import heapq
+
+IMPACT = 'impact'
+RELEASE = 'release'
+WAYPOINT = 'waypoint'
+
+
+class Event:
+
+    def __init__(self, time, kind, obj=None, data=None):
+        """Something that happened (or will happen) at a point in time
+
+        :param time: Simulation time of the event in seconds
+        :type time: float
+
+        :param kind: One of IMPACT, RELEASE or WAYPOINT
+        :type kind: str
+
+        :param obj: (Optional) The dynamic object involved, e.g. the one
+                    that hit something
+        :type obj: maddux.objects.DynamicObject or None
+
+        :param data: (Optional) Anything else about the event, e.g. the
+                     joint angles of a waypoint
+        :type data: object or None
+
+        :rtype: None
+        """
+        self.time = time
+        self.kind = kind
+        self.obj = obj
+        self.data = data
+
+    def __repr__(self):
+        return "Event({:.4f}, {!r})".format(self.time, self.kind)
+
+
+class EventQueue:
+
+    def __init__(self):
+        """Events ordered by time. Events at the same time come out in the
+        order they were pushed."""
+        self.heap = []
+        self.count = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, event):
+        """Schedule an event
+
+        :param event: The event to schedule
+        :type event: maddux.events.Event
+
+        :rtype: None
+        """
+        heapq.heappush(self.heap, (event.time, self.count, event))
+        self.count += 1
+
+    def pop(self):
+        """Remove and return the earliest event
+
+        :rtype: maddux.events.Event
+        """
+        return heapq.heappop(self.heap)[2]
+
+    def next_time(self):
+        """Time of the earliest event
+
+        :returns: The time, or inf if nothing is scheduled
+        :rtype: float
+        """
+        return self.heap[0][0] if self.heap else float('inf')
+
+    def clear(self):
+        """Drop every scheduled event
+
+        :rtype: None
+        """
+        self.heap = []
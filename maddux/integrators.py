@@ -0,0 +1,149 @@
+"""
+Numerical integrators for second order motion, i.e. a position x and a
+velocity v whose acceleration is a function accel(x, v). The same
+integrators move thrown objects (Kx3 arrays) and spin links (floats).
+"""
+import abc
+import numpy as np
+
+
+def constant(accel):
+    """An acceleration function that ignores the state
+
+    :param accel: The acceleration, e.g. (0, 0, gravity)
+    :type accel: float or numpy.ndarray
+
+    :rtype: function
+    """
+    return lambda x, v: accel
+
+
+class Integrator:
+    __metaclass__ = abc.ABCMeta
+
+    # Order of accuracy, used to pick step sizes when adapting
+    order = 1
+
+    @abc.abstractmethod
+    def step(self, accel, x, v, dt):
+        """Move a state forward in time
+
+        :param accel: Acceleration as a function of (x, v)
+        :type accel: function
+
+        :param x: Position(s)
+        :type x: float or numpy.ndarray
+
+        :param v: Velocity(s), the same shape as x
+        :type v: float or numpy.ndarray
+
+        :param dt: Time to move forward by in seconds
+        :type dt: float
+
+        :returns: The new position(s) and velocity(s)
+        :rtype: tuple
+        """
+        return
+
+
+class SemiImplicitEuler(Integrator):
+    """Update the velocity, then move with the new velocity. This is how
+    objects and links have always been stepped, and is the default."""
+    order = 1
+
+    def step(self, accel, x, v, dt):
+        v = v + dt * accel(x, v)
+        return x + dt * v, v
+
+
+class VelocityVerlet(Integrator):
+    """Second order and symplectic; exact for constant acceleration"""
+    order = 2
+
+    def step(self, accel, x, v, dt):
+        a0 = accel(x, v)
+        x = x + dt * v + 0.5 * dt * dt * a0
+        a1 = accel(x, v + dt * a0)
+        return x, v + 0.5 * dt * (a0 + a1)
+
+
+class RK4(Integrator):
+    """Classic fourth order Runge-Kutta"""
+    order = 4
+
+    def step(self, accel, x, v, dt):
+        h = 0.5 * dt
+        k1x, k1v = v, accel(x, v)
+        k2x, k2v = v + h * k1v, accel(x + h * k1x, v + h * k1v)
+        k3x, k3v = v + h * k2v, accel(x + h * k2x, v + h * k2v)
+        k4x, k4v = v + dt * k3v, accel(x + dt * k3x, v + dt * k3v)
+        return (x + dt / 6.0 * (k1x + 2 * k2x + 2 * k3x + k4x),
+                v + dt / 6.0 * (k1v + 2 * k2v + 2 * k3v + k4v))
+
+
+class AdaptiveIntegrator(Integrator):
+
+    def __init__(self, integrator, tolerance=1e-6, min_step=1e-6,
+                 max_step=None, safety=0.9):
+        """Wraps another integrator, covering each step with as many
+        substeps as needed to keep the error below a tolerance. The error
+        of a substep is estimated by comparing one full substep with two
+        half substeps, and the next substep grows or shrinks to match.
+
+        :param integrator: The integrator to take substeps with
+        :type integrator: maddux.integrators.Integrator
+
+        :param tolerance: (Default: 1e-6) Largest error allowed per
+                          substep, in position or velocity units
+        :type tolerance: float
+
+        :param min_step: (Default: 1e-6) Smallest substep to take, even if
+                         the tolerance is not met
+        :type min_step: float
+
+        :param max_step: (Optional) Largest substep to take
+        :type max_step: float or None
+
+        :param safety: (Default: 0.9) Factor to shrink the predicted
+                       substep size by
+        :type safety: float
+
+        :rtype: None
+        """
+        self.integrator = integrator
+        self.order = integrator.order
+        self.tolerance = tolerance
+        self.min_step = min_step
+        self.max_step = max_step
+        self.safety = safety
+
+        # Substep size to start the next step with
+        self.substep = None
+
+    def step(self, accel, x, v, dt):
+        remaining = dt
+        h = dt if self.substep is None else min(self.substep, dt)
+        while remaining > 0:
+            h = min(h, remaining)
+            full = self.integrator.step(accel, x, v, h)
+            half = self.integrator.step(accel, x, v, 0.5 * h)
+            half = self.integrator.step(accel, half[0], half[1], 0.5 * h)
+            error = max(np.max(np.abs(np.subtract(full[0], half[0]))),
+                        np.max(np.abs(np.subtract(full[1], half[1]))))
+
+            if error <= self.tolerance or h <= self.min_step:
+                x, v = half
+                remaining -= h
+
+            # Predict the substep that would just meet the tolerance
+            if error == 0:
+                factor = 5.0
+            else:
+                factor = self.safety * (self.tolerance / error) ** (
+                    1.0 / (self.order + 1))
+                factor = min(5.0, max(0.2, factor))
+            h = max(self.min_step, h * factor)
+            if self.max_step is not None:
+                h = min(h, self.max_step)
+            self.substep = h
+        return x, v
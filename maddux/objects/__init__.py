@@ -1,3 +1,5 @@
 from ball import Ball
 from target import Target
 from obstacle import Obstacle
+from obstacle_set import ObstacleSet
+from dynamic_array import DynamicObjectArray
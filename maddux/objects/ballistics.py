@@ -0,0 +1,157 @@
+"""
+Exact projectile motion under constant gravity along z, and the times at
+which a projectile's path meets walls and boxes.
+"""
+import math
+import numpy as np
+
+
+def position_at(position, velocity, t, gravity):
+    """Position of a projectile after t seconds
+
+    :param position: Starting position (x, y, z)
+    :type position: numpy.ndarray
+
+    :param velocity: Starting velocity (vx, vy, vz)
+    :type velocity: numpy.ndarray
+
+    :param t: Time in seconds, or M times
+    :type t: float or numpy.ndarray
+
+    :param gravity: Acceleration along z
+    :type gravity: float
+
+    :returns: The position (x, y, z), or Mx3 positions
+    :rtype: numpy.ndarray
+    """
+    t = np.asarray(t, dtype=float)[..., np.newaxis]
+    accel = np.array([0.0, 0.0, gravity])
+    return (np.asarray(position, dtype=float) +
+            np.asarray(velocity, dtype=float) * t + 0.5 * accel * t ** 2)
+
+
+def velocity_at(velocity, t, gravity):
+    """Velocity of a projectile after t seconds
+
+    :param velocity: Starting velocity (vx, vy, vz)
+    :type velocity: numpy.ndarray
+
+    :param t: Time in seconds
+    :type t: float
+
+    :param gravity: Acceleration along z
+    :type gravity: float
+
+    :returns: The velocity (vx, vy, vz)
+    :rtype: numpy.ndarray
+    """
+    velocity = np.array(velocity, dtype=float)
+    velocity[2] += gravity * t
+    return velocity
+
+
+def room_exit_time(position, velocity, dimensions, gravity):
+    """Earliest time a projectile reaches a wall of the [0, dimensions]
+    room, i.e. some coordinate is <= 0 or >= its dimension
+
+    :param position: Starting position (x, y, z)
+    :type position: numpy.ndarray
+
+    :param velocity: Starting velocity (vx, vy, vz)
+    :type velocity: numpy.ndarray
+
+    :param dimensions: The room's size (x, y, z)
+    :type dimensions: numpy.ndarray
+
+    :param gravity: Acceleration along z
+    :type gravity: float
+
+    :returns: The time, or inf if it never gets there
+    :rtype: float
+    """
+    best = float('inf')
+    for i, a in enumerate((0.0, 0.0, gravity)):
+        p = position[i]
+        if p <= 0 or p >= dimensions[i]:
+            return 0.0
+        for wall in (0.0, dimensions[i]):
+            for t in _roots(0.5 * a, velocity[i], p - wall):
+                if 0 <= t < best:
+                    best = t
+    return best
+
+
+def box_impact_time(position, velocity, lo, hi, gravity):
+    """Earliest time a projectile is inside the box [lo, hi]
+
+    :param position: Starting position (x, y, z)
+    :type position: numpy.ndarray
+
+    :param velocity: Starting velocity (vx, vy, vz)
+    :type velocity: numpy.ndarray
+
+    :param lo: Lower corner of the box
+    :type lo: numpy.ndarray
+
+    :param hi: Upper corner of the box
+    :type hi: numpy.ndarray
+
+    :param gravity: Acceleration along z
+    :type gravity: float
+
+    :returns: The time, or inf if it never gets there
+    :rtype: float
+    """
+    intervals = [(0.0, float('inf'))]
+    for i, a in enumerate((0.0, 0.0, gravity)):
+        inside = _inside_intervals(position[i], velocity[i], a, lo[i], hi[i])
+        intervals = [(max(s0, s1), min(e0, e1))
+                     for s0, e0 in intervals for s1, e1 in inside
+                     if max(s0, s1) <= min(e0, e1)]
+        if not intervals:
+            return float('inf')
+    return min(start for start, _ in intervals)
+
+
+def _roots(a, b, c):
+    """Real roots of a * t**2 + b * t + c = 0"""
+    if a == 0:
+        return [] if b == 0 else [-c / b]
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return []
+    # Numerically stable form of the quadratic formula
+    q = -0.5 * (b + math.copysign(math.sqrt(disc), b))
+    if q == 0:
+        return [0.0]
+    return [q / a, c / q]
+
+
+def _inside_intervals(p, v, a, lo, hi):
+    """Time intervals t >= 0 during which p + v t + a t^2 / 2 lies in
+    [lo, hi]"""
+    times = [0.0]
+    for bound in (lo, hi):
+        times.extend(t for t in _roots(0.5 * a, v, p - bound) if t > 0)
+    times = sorted(times)
+
+    def inside(t):
+        s = p + v * t + 0.5 * a * t * t
+        return lo <= s <= hi
+
+    # Membership only changes at the roots, so test each piece once
+    intervals = []
+    ends = times[1:] + [float('inf')]
+    for start, end in zip(times, ends):
+        middle = start + 1.0 if end == float('inf') else 0.5 * (start + end)
+        if not inside(middle):
+            continue
+        if intervals and intervals[-1][1] == start:
+            intervals[-1] = (intervals[-1][0], end)
+        else:
+            intervals.append((start, end))
+
+    # Starting on the boundary and immediately leaving still counts
+    if inside(0.0) and not (intervals and intervals[0][0] == 0.0):
+        intervals.insert(0, (0.0, 0.0))
+    return intervals
@@ -0,0 +1,128 @@
+"""
+A uniform grid over an environment used to find the static objects near
+a query without testing all of them.
+"""
+import numpy as np
+
+
+class UniformGrid:
+
+    def __init__(self, dimensions, cell_size=None):
+        """A grid of equal cubic cells covering [0, dimensions]. Items
+        (and queries) reaching outside the grid are clamped to its border
+        cells, so nothing is ever missed.
+
+        :param dimensions: The (x, y, z) size of the space to cover
+        :type dimensions: numpy.ndarray
+
+        :param cell_size: (Optional) Edge length of a cell. Defaults to a
+                          size giving about 4096 cells.
+        :type cell_size: float or None
+
+        :rtype: None
+        """
+        self.dimensions = np.asarray(dimensions, dtype=float)
+        if cell_size is None:
+            cell_size = (np.prod(self.dimensions) / 4096.0) ** (1.0 / 3.0)
+        self.cell_size = float(cell_size)
+        self.shape = np.maximum(
+            np.ceil(self.dimensions / self.cell_size).astype(int), 1)
+
+        # Cell (i, j, k) -> set of items overlapping it
+        self.cells = {}
+        # Item -> the (lo, hi) cell ranges it was inserted with
+        self.items = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def insert(self, item, lo, hi):
+        """Insert an item by its bounding box
+
+        :param item: Any hashable key for the item
+        :type item: hashable
+
+        :param lo: Lower corner (x, y, z) of the item's bounding box
+        :type lo: numpy.ndarray
+
+        :param hi: Upper corner (x, y, z) of the item's bounding box
+        :type hi: numpy.ndarray
+
+        :rtype: None
+        """
+        cells = self._cell_range(lo, hi)
+        self.items[item] = cells
+        for cell in self._cells_in(*cells):
+            self.cells.setdefault(cell, set()).add(item)
+
+    def remove(self, item):
+        """Remove an item from every cell it overlaps
+
+        :param item: The item's key
+        :type item: hashable
+
+        :rtype: None
+        """
+        for cell in self._cells_in(*self.items.pop(item)):
+            self.cells[cell].discard(item)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def update(self, item, lo, hi):
+        """Refit an item after its bounding box changed. Only the cells
+        it left or entered are touched.
+
+        :param item: The item's key
+        :type item: hashable
+
+        :param lo: New lower corner (x, y, z)
+        :type lo: numpy.ndarray
+
+        :param hi: New upper corner (x, y, z)
+        :type hi: numpy.ndarray
+
+        :rtype: None
+        """
+        old = set(self._cells_in(*self.items[item]))
+        cells = self._cell_range(lo, hi)
+        new = set(self._cells_in(*cells))
+        self.items[item] = cells
+
+        for cell in old - new:
+            self.cells[cell].discard(item)
+            if not self.cells[cell]:
+                del self.cells[cell]
+        for cell in new - old:
+            self.cells.setdefault(cell, set()).add(item)
+
+    def query(self, lo, hi):
+        """Find the items sharing a cell with a bounding box
+
+        :param lo: Lower corner (x, y, z) of the query box
+        :type lo: numpy.ndarray
+
+        :param hi: Upper corner (x, y, z) of the query box
+        :type hi: numpy.ndarray
+
+        :returns: The candidate items
+        :rtype: set
+        """
+        found = set()
+        for cell in self._cells_in(*self._cell_range(lo, hi)):
+            found.update(self.cells.get(cell, ()))
+        return found
+
+    def _cell_range(self, lo, hi):
+        """Clamped first and last cell indices covered by a box"""
+        first = np.clip(np.floor(np.asarray(lo) / self.cell_size).astype(int),
+                        0, self.shape - 1)
+        last = np.clip(np.floor(np.asarray(hi) / self.cell_size).astype(int),
+                       0, self.shape - 1)
+        return tuple(first), tuple(last)
+
+    def _cells_in(self, first, last):
+        """Every cell index between first and last inclusive"""
+        for i in xrange(first[0], last[0] + 1):
+            for j in xrange(first[1], last[1] + 1):
+                for k in xrange(first[2], last[2] + 1):
+                    yield (i, j, k)
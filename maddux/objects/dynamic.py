@@ -3,6 +3,7 @@ An abstract base class for dynamic objects.
 """
 import abc
 import numpy as np
+from maddux.utils.trajectory import TrajectoryBuffer
 
 
 class DynamicObject:
@@ -18,9 +19,47 @@ class DynamicObject:
                        an experiment
         :type target: bool
         """
+        # The DynamicObjectArray holding this object's state, if any
+        self.array = None
+        self.index = None
+
         self.position = np.array(position)
         self.target = target
-        self.positions = np.array([self.position.copy()])
+        self._positions = TrajectoryBuffer([self.position])
+
+    @property
+    def position(self):
+        """Current (x, y, z) position. A view into the array's positions
+        while the object belongs to a DynamicObjectArray."""
+        if self.array is None:
+            return self._position
+        return self.array.positions[self.index]
+
+    @position.setter
+    def position(self, position):
+        if self.array is None:
+            self._position = position
+        else:
+            self.array.positions[self.index] = position
+
+    @property
+    def positions(self):
+        """Read only Mx3 array of the positions recorded so far"""
+        return self.history().array
+
+    @positions.setter
+    def positions(self, positions):
+        self.history().reset(positions)
+
+    def history(self):
+        """The buffer of recorded positions, including any steps taken by
+        the DynamicObjectArray holding this object
+
+        :rtype: maddux.utils.trajectory.TrajectoryBuffer
+        """
+        if self.array is not None:
+            self.array.flush()
+        return self._positions
 
     @abc.abstractmethod
     def step(self):
@@ -0,0 +1,247 @@
+"""
+Positions, velocities and attached flags of many throwable objects kept in
+shared arrays so they can all be stepped at once.
+"""
+import numpy as np
+from throwable import GRAVITY, TIME
+from maddux.integrators import SemiImplicitEuler, constant
+from maddux.utils.trajectory import TrajectoryBuffer
+
+
+class DynamicObjectArray:
+
+    def __init__(self, objects=None, flush_every=1000, integrator=None):
+        """Holds the state of K throwable objects as a Kx3 positions array,
+        a Kx3 velocities array and a K attached array. Each object keeps
+        working as before, but its position, velocity and attached flag
+        become views into rows of these arrays.
+
+        :param objects: (Optional) The objects to hold
+        :type objects: list of maddux.objects.ThrowableObject or None
+
+        :param flush_every: (Default: 1000) Number of steps recorded in the
+                            shared history before it is copied into each
+                            object's own positions
+        :type flush_every: int
+
+        :param integrator: (Optional) How to move the objects each step.
+                           If not given, semi-implicit Euler as
+                           ThrowableObject.step uses, done in place.
+        :type integrator: maddux.integrators.Integrator or None
+
+        :rtype: None
+        """
+        self.flush_every = flush_every
+        self.integrator = integrator
+        self.objects = []
+        self.positions = np.zeros((0, 3))
+        self.velocities = np.zeros((0, 3))
+        self.attached = np.zeros(0, dtype=bool)
+
+        # Steps taken since the last flush, one row of K positions per
+        # step, and which objects actually moved during each of them
+        self.history = TrajectoryBuffer(np.zeros((0, 0)))
+        self.moved = TrajectoryBuffer(np.zeros((0, 0)))
+
+        if objects:
+            self.extend(objects)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __getitem__(self, index):
+        return self.objects[index]
+
+    def add(self, obj):
+        """Add an object, moving its state into the arrays
+
+        :param obj: The object to add
+        :type obj: maddux.objects.ThrowableObject
+
+        :rtype: None
+        """
+        self.extend([obj])
+
+    def extend(self, objects):
+        """Add many objects, moving their state into the arrays all at
+        once
+
+        :param objects: The objects to add
+        :type objects: list of maddux.objects.ThrowableObject
+
+        :rtype: None
+        """
+        objects = list(objects)
+        # Take the objects out of any arrays they are already in, one
+        # rebuild per array
+        owners = []
+        for obj in objects:
+            if obj.array is not None and obj.array not in owners:
+                owners.append(obj.array)
+        for owner in owners:
+            owner.discard([obj for obj in objects if obj.array is owner])
+
+        self.flush()
+        self.objects.extend(objects)
+        self._rebuild()
+
+    def remove(self, obj):
+        """Remove an object, giving it back its own copy of its state
+
+        :param obj: The object to remove
+        :type obj: maddux.objects.ThrowableObject
+
+        :rtype: None
+        """
+        if obj.array is not self:
+            raise ValueError("Object is not in this array")
+        self.discard([obj])
+
+    def discard(self, objects):
+        """Remove many objects at once, giving each back its own copy of
+        its state. Objects not in the array are ignored.
+
+        :param objects: The objects to remove
+        :type objects: list of maddux.objects.ThrowableObject
+
+        :rtype: None
+        """
+        objects = [obj for obj in objects if obj.array is self]
+        if not objects:
+            return
+        self.flush()
+        for obj in objects:
+            state = (self.positions[obj.index].copy(),
+                     self.velocities[obj.index].copy(),
+                     bool(self.attached[obj.index]))
+            obj.array = None
+            obj.index = None
+            obj.position, obj.velocity, obj.attached = state
+        removed = set(id(obj) for obj in objects)
+        self.objects = [obj for obj in self.objects
+                        if id(obj) not in removed]
+        self._rebuild()
+
+    def step(self, time=TIME, gravity=GRAVITY):
+        """Step every free object forward in one vectorized update, the
+        same way ThrowableObject.step does for a single object
+
+        :param time: (Default: one ms) Length of the step in seconds
+        :type time: float
+
+        :param gravity: (Default: -9.81) Acceleration along z
+        :type gravity: float
+
+        :rtype: None
+        """
+        free = ~self.attached
+        if not free.any():
+            return
+        if self.integrator is not None:
+            self.update(*self.integrate(time, gravity))
+            return
+
+        # Semi-implicit Euler straight into the arrays, skipping the mask
+        # when every object is in flight
+        if free.all():
+            self.velocities[:, 2] += time * gravity
+            self.positions += time * self.velocities
+        else:
+            self.velocities[free, 2] += time * gravity
+            self.positions[free] += time * self.velocities[free]
+        self._record(free)
+
+    def integrate(self, time=TIME, gravity=GRAVITY, integrator=None):
+        """Where every free object would be after a step, without moving
+        any of them
+
+        :param time: (Default: one ms) Length of the step in seconds
+        :type time: float
+
+        :param gravity: (Default: -9.81) Acceleration along z
+        :type gravity: float
+
+        :param integrator: (Optional) Integrator to use instead of the
+                           array's own
+        :type integrator: maddux.integrators.Integrator or None
+
+        :returns: Kx3 positions and Kx3 velocities, where attached objects
+                  stay as they are
+        :rtype: tuple
+        """
+        if integrator is None:
+            integrator = self.integrator
+        if integrator is None:
+            integrator = SemiImplicitEuler()
+
+        positions = self.positions.copy()
+        velocities = self.velocities.copy()
+        free = ~self.attached
+        if free.any():
+            positions[free], velocities[free] = integrator.step(
+                constant(np.array([0.0, 0.0, gravity])), positions[free],
+                velocities[free], time)
+        return positions, velocities
+
+    def update(self, positions, velocities):
+        """Move the free objects to new positions and velocities (e.g.
+        from integrate), recording the step in their positions
+
+        :param positions: Kx3 new positions
+        :type positions: numpy.ndarray
+
+        :param velocities: Kx3 new velocities
+        :type velocities: numpy.ndarray
+
+        :rtype: None
+        """
+        free = ~self.attached
+        self.positions[free] = positions[free]
+        self.velocities[free] = velocities[free]
+        self._record(free)
+
+    def _record(self, free):
+        """Record the current positions as a step taken by the free
+        objects"""
+        self.history.append(self.positions.ravel())
+        self.moved.append(free)
+        if len(self.history) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Copy the steps recorded so far into each object's positions
+
+        :rtype: None
+        """
+        if not len(self.history):
+            return
+        steps = self.history.array.reshape((-1, len(self.objects), 3))
+        moved = self.moved.array.astype(bool)
+        for k, obj in enumerate(self.objects):
+            obj._positions.extend(steps[moved[:, k], k])
+        self.history.reset(np.zeros((0, 3 * len(self.objects))))
+        self.moved.reset(np.zeros((0, len(self.objects))))
+
+    def _rebuild(self):
+        """Reallocate the arrays after objects were added or removed,
+        pointing every object at its new row"""
+        K = len(self.objects)
+        positions = np.zeros((K, 3))
+        velocities = np.zeros((K, 3))
+        attached = np.zeros(K, dtype=bool)
+        for k, obj in enumerate(self.objects):
+            positions[k] = obj.position
+            velocities[k] = obj.velocity
+            attached[k] = obj.attached
+
+        self.positions = positions
+        self.velocities = velocities
+        self.attached = attached
+        for k, obj in enumerate(self.objects):
+            obj.array = self
+            obj.index = k
+        self.history.reset(np.zeros((0, 3 * K)))
+        self.moved.reset(np.zeros((0, K)))
@@ -0,0 +1,406 @@
+"""
+Exact segment and capsule queries against axis aligned boxes (as hit
+tests and as signed distances) and against each other.
+
+The scalar functions work on plain floats so a single query allocates no
+arrays. The vectorized functions broadcast over any leading dimensions,
+e.g. (M, 1, 3) segments against (1, K, 3) boxes.
+"""
+import math
+import numpy as np
+
+
+def segment_intersects_box(a, b, lo, hi):
+    """Slab test of whether segment ab passes through the box [lo, hi]
+
+    :param a: Segment start (x, y, z)
+    :type a: numpy.ndarray
+
+    :param b: Segment end (x, y, z)
+    :type b: numpy.ndarray
+
+    :param lo: Lower corner of the box
+    :type lo: numpy.ndarray
+
+    :param hi: Upper corner of the box
+    :type hi: numpy.ndarray
+
+    :rtype: bool
+    """
+    t0 = 0.0
+    t1 = 1.0
+    for i in range(3):
+        d = b[i] - a[i]
+        if d == 0:
+            if a[i] < lo[i] or a[i] > hi[i]:
+                return False
+            continue
+
+        ta = (lo[i] - a[i]) / d
+        tb = (hi[i] - a[i]) / d
+        if ta > tb:
+            ta, tb = tb, ta
+        t0 = max(t0, ta)
+        t1 = min(t1, tb)
+        if t0 > t1:
+            return False
+    return True
+
+
+def segment_box_distance(a, b, lo, hi):
+    """Exact distance between segment ab and the box [lo, hi], zero if
+    they touch. The squared distance along the segment is a convex
+    piecewise quadratic whose pieces start and end where the segment
+    crosses a slab, so minimizing each piece gives the exact answer.
+
+    :param a: Segment start (x, y, z)
+    :type a: numpy.ndarray
+
+    :param b: Segment end (x, y, z)
+    :type b: numpy.ndarray
+
+    :param lo: Lower corner of the box
+    :type lo: numpy.ndarray
+
+    :param hi: Upper corner of the box
+    :type hi: numpy.ndarray
+
+    :rtype: float
+    """
+    ts = [0.0, 1.0]
+    for i in range(3):
+        d = b[i] - a[i]
+        if d != 0:
+            for bound in (lo[i], hi[i]):
+                t = (bound - a[i]) / d
+                if 0.0 < t < 1.0:
+                    ts.append(t)
+    ts.sort()
+
+    best = float('inf')
+    for t0, t1 in zip(ts[:-1], ts[1:]):
+        # Faces the segment lies outside of stay fixed over the piece
+        tm = 0.5 * (t0 + t1)
+        num = 0.0
+        den = 0.0
+        for i in range(3):
+            d = b[i] - a[i]
+            s = a[i] + tm * d
+            if s < lo[i]:
+                bound = lo[i]
+            elif s > hi[i]:
+                bound = hi[i]
+            else:
+                continue
+            num -= d * (a[i] - bound)
+            den += d * d
+
+        t = num / den if den > 0 else tm
+        t = min(max(t, t0), t1)
+
+        dist = 0.0
+        for i in range(3):
+            s = a[i] + t * (b[i] - a[i])
+            if s < lo[i]:
+                dist += (lo[i] - s) ** 2
+            elif s > hi[i]:
+                dist += (s - hi[i]) ** 2
+        best = min(best, dist)
+
+    return math.sqrt(best)
+
+
+def capsule_hits_box(a, b, radius, lo, hi):
+    """Whether the capsule around segment ab touches the box [lo, hi]
+
+    :param a: Segment start (x, y, z)
+    :type a: numpy.ndarray
+
+    :param b: Segment end (x, y, z)
+    :type b: numpy.ndarray
+
+    :param radius: Capsule radius
+    :type radius: float
+
+    :param lo: Lower corner of the box
+    :type lo: numpy.ndarray
+
+    :param hi: Upper corner of the box
+    :type hi: numpy.ndarray
+
+    :rtype: bool
+    """
+    # Cheap reject against the box grown by the radius
+    grown_lo = (lo[0] - radius, lo[1] - radius, lo[2] - radius)
+    grown_hi = (hi[0] + radius, hi[1] + radius, hi[2] + radius)
+    if not segment_intersects_box(a, b, grown_lo, grown_hi):
+        return False
+    if segment_intersects_box(a, b, lo, hi):
+        return True
+    return segment_box_distance(a, b, lo, hi) <= radius
+
+
+def point_box_distances(p, lo, hi):
+    """Signed distance from points to boxes, negative inside a box by the
+    distance to its nearest face
+
+    :param p: ...x3 points
+    :type p: numpy.ndarray
+
+    :param lo: ...x3 lower box corners
+    :type lo: numpy.ndarray
+
+    :param hi: ...x3 upper box corners
+    :type hi: numpy.ndarray
+
+    :returns: Signed distances with the broadcast leading shape
+    :rtype: numpy.ndarray
+    """
+    p = np.asarray(p, dtype=float)
+    below = lo - p
+    above = p - hi
+    outside = np.maximum(below, 0.0) + np.maximum(above, 0.0)
+    # Inside, both gaps are negative on every axis
+    inside = np.minimum(np.max(np.maximum(below, above), axis=-1), 0.0)
+    return np.sqrt(np.sum(outside ** 2, axis=-1)) + inside
+
+
+def segment_box_distances(a, b, lo, hi):
+    """Vectorized segment_box_distance
+
+    :param a: ...x3 segment starts
+    :type a: numpy.ndarray
+
+    :param b: ...x3 segment ends
+    :type b: numpy.ndarray
+
+    :param lo: ...x3 lower box corners
+    :type lo: numpy.ndarray
+
+    :param hi: ...x3 upper box corners
+    :type hi: numpy.ndarray
+
+    :returns: Distances with the broadcast leading shape
+    :rtype: numpy.ndarray
+    """
+    a, b, lo, hi = np.broadcast_arrays(*[np.asarray(x, dtype=float)
+                                         for x in (a, b, lo, hi)])
+    _, dist2 = _nearest_on_segment(a, b - a, lo, hi)
+    return np.sqrt(dist2)
+
+
+def segment_segment_distances(a, b, c, d):
+    """Distance between segments ab and cd
+
+    :param a: ...x3 starts of the first segments
+    :type a: numpy.ndarray
+
+    :param b: ...x3 ends of the first segments
+    :type b: numpy.ndarray
+
+    :param c: ...x3 starts of the second segments
+    :type c: numpy.ndarray
+
+    :param d: ...x3 ends of the second segments
+    :type d: numpy.ndarray
+
+    :returns: Distances with the broadcast leading shape
+    :rtype: numpy.ndarray
+    """
+    a, b, c, d = np.broadcast_arrays(*[np.asarray(x, dtype=float)
+                                       for x in (a, b, c, d)])
+    u = b - a
+    v = d - c
+    w = a - c
+    uu = np.sum(u * u, axis=-1)
+    vv = np.sum(v * v, axis=-1)
+    uv = np.sum(u * v, axis=-1)
+    uw = np.sum(u * w, axis=-1)
+    vw = np.sum(v * w, axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Closest points of the infinite lines, clamped to the first
+        # segment; parallel or degenerate segments start from its start
+        denom = uu * vv - uv * uv
+        s = np.where(denom > 1e-12, np.clip((uv * vw - uw * vv) / denom,
+                                            0.0, 1.0), 0.0)
+
+        # Best point on the second segment for s, then clamp it and
+        # refit s if it fell off either end
+        t = np.where(vv > 1e-12, (uv * s + vw) / vv, 0.0)
+        s_start = np.where(uu > 1e-12, np.clip(-uw / uu, 0.0, 1.0), 0.0)
+        s_end = np.where(uu > 1e-12, np.clip((uv - uw) / uu, 0.0, 1.0), 0.0)
+    s = np.where(t < 0, s_start, np.where(t > 1, s_end, s))
+    s = np.where(vv > 1e-12, s, s_start)
+    t = np.clip(t, 0.0, 1.0)
+
+    gap = w + s[..., np.newaxis] * u - t[..., np.newaxis] * v
+    return np.sqrt(np.sum(gap ** 2, axis=-1))
+
+
+def capsules_hit_boxes(a, b, radius, lo, hi):
+    """Vectorized capsule_hits_box
+
+    :param a: ...x3 segment starts
+    :type a: numpy.ndarray
+
+    :param b: ...x3 segment ends
+    :type b: numpy.ndarray
+
+    :param radius: Capsule radii, broadcastable to the leading shape
+    :type radius: numpy.ndarray or float
+
+    :param lo: ...x3 lower box corners
+    :type lo: numpy.ndarray
+
+    :param hi: ...x3 upper box corners
+    :type hi: numpy.ndarray
+
+    :returns: Boolean mask with the broadcast leading shape
+    :rtype: numpy.ndarray
+    """
+    return segment_box_distances(a, b, lo, hi) <= radius
+
+
+def capsule_box_distances(a, b, radius, lo, hi):
+    """Signed distance between capsules and boxes: the gap between them
+    when apart, or minus the depth they overlap by
+
+    :param a: ...x3 segment starts
+    :type a: numpy.ndarray
+
+    :param b: ...x3 segment ends
+    :type b: numpy.ndarray
+
+    :param radius: Capsule radii, broadcastable to the leading shape
+    :type radius: numpy.ndarray or float
+
+    :param lo: ...x3 lower box corners
+    :type lo: numpy.ndarray
+
+    :param hi: ...x3 upper box corners
+    :type hi: numpy.ndarray
+
+    :returns: Signed distances with the broadcast leading shape
+    :rtype: numpy.ndarray
+    """
+    return capsule_box_closest_points(a, b, radius, lo, hi)[0]
+
+
+def capsule_box_closest_points(a, b, radius, lo, hi):
+    """Signed distance and closest point pair between capsules and boxes.
+    When a capsule and box overlap the points are the capsule's deepest
+    point inside the box and the box surface point nearest to it, so in
+    every case the points are abs(distance) apart.
+
+    :param a: ...x3 segment starts
+    :type a: numpy.ndarray
+
+    :param b: ...x3 segment ends
+    :type b: numpy.ndarray
+
+    :param radius: Capsule radii, broadcastable to the leading shape
+    :type radius: numpy.ndarray or float
+
+    :param lo: ...x3 lower box corners
+    :type lo: numpy.ndarray
+
+    :param hi: ...x3 upper box corners
+    :type hi: numpy.ndarray
+
+    :returns: Signed distances, ...x3 points on the capsules and ...x3
+              points on the boxes
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    a, b, lo, hi = np.broadcast_arrays(*[np.asarray(x, dtype=float)
+                                         for x in (a, b, lo, hi)])
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), a.shape[:-1])
+    d = b - a
+
+    t, dist2 = _nearest_on_segment(a, d, lo, hi)
+    t_deep, depth = _deepest_on_segment(a, d, lo, hi)
+    inside = depth > 0
+    t = np.where(inside, t_deep, t)
+
+    axis_point = a + t[..., np.newaxis] * d
+    box_point = np.clip(axis_point, lo, hi)
+
+    # Points inside a box are pushed out through its nearest face
+    gaps = np.concatenate((axis_point - lo, hi - axis_point), axis=-1)
+    face = np.argmin(gaps, axis=-1)[..., np.newaxis]
+    wall = np.take_along_axis(np.concatenate((lo, hi), axis=-1), face, -1)
+    on_face = inside[..., np.newaxis] & (np.arange(3) == face % 3)
+    box_point = np.where(on_face, wall, box_point)
+
+    segment_distance = np.where(inside, -depth, np.sqrt(dist2))
+
+    # Step from the capsule's axis to its surface, towards the box when
+    # outside it and away from the box's surface when inside
+    offset = box_point - axis_point
+    norm = np.sqrt(np.sum(offset ** 2, axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(norm > 0, radius / norm, 0.0)
+    scale = np.where(inside, -scale, scale)
+    capsule_point = axis_point + scale[..., np.newaxis] * offset
+
+    return segment_distance - radius, capsule_point, box_point
+
+
+def _nearest_on_segment(a, d, lo, hi):
+    """Segment parameter nearest to each box and the squared distance"""
+    # Every slab crossing splits the segment into another piece
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossings = np.concatenate(((lo - a) / d, (hi - a) / d), axis=-1)
+    crossings[~np.isfinite(crossings)] = 0.0
+    ends = np.zeros(a.shape[:-1] + (2,))
+    ends[..., 1] = 1.0
+    ts = np.sort(np.clip(np.concatenate((ends, crossings), axis=-1),
+                         0.0, 1.0), axis=-1)
+    t0 = ts[..., :-1]
+    t1 = ts[..., 1:]
+
+    a = a[..., np.newaxis, :]
+    d = d[..., np.newaxis, :]
+    lo = lo[..., np.newaxis, :]
+    hi = hi[..., np.newaxis, :]
+
+    # Minimize each piece's quadratic using the faces active at its middle
+    s = a + 0.5 * (t0 + t1)[..., np.newaxis] * d
+    bound = np.where(s < lo, lo, np.where(s > hi, hi, np.nan))
+    active = ~np.isnan(bound)
+    num = -np.sum(np.where(active, d * (a - bound), 0.0), axis=-1)
+    den = np.sum(np.where(active, d * d, 0.0), axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(den > 0, num / den, t0)
+    t = np.clip(t, t0, t1)
+
+    s = a + t[..., np.newaxis] * d
+    outside = np.maximum(lo - s, 0.0) + np.maximum(s - hi, 0.0)
+    dist2 = np.sum(outside ** 2, axis=-1)
+
+    best = np.argmin(dist2, axis=-1)[..., np.newaxis]
+    return (np.take_along_axis(t, best, -1)[..., 0],
+            np.take_along_axis(dist2, best, -1)[..., 0])
+
+
+def _deepest_on_segment(a, d, lo, hi):
+    """Segment parameter deepest inside each box and that depth, which is
+    not positive if the segment never enters the box"""
+    # Depth along the segment is the minimum of six linear face gaps, so
+    # it peaks at an end or where two of the gaps cross
+    c = np.concatenate((a - lo, hi - a), axis=-1)
+    m = np.concatenate((d, -d), axis=-1)
+    j, k = np.triu_indices(6, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossings = (c[..., k] - c[..., j]) / (m[..., j] - m[..., k])
+    crossings[~np.isfinite(crossings)] = 0.0
+    ends = np.zeros(a.shape[:-1] + (2,))
+    ends[..., 1] = 1.0
+    ts = np.clip(np.concatenate((ends, crossings), axis=-1), 0.0, 1.0)
+
+    depth = np.min(c[..., np.newaxis, :] +
+                   ts[..., np.newaxis] * m[..., np.newaxis, :], axis=-1)
+
+    best = np.argmax(depth, axis=-1)[..., np.newaxis]
+    return (np.take_along_axis(ts, best, -1)[..., 0],
+            np.take_along_axis(depth, best, -1)[..., 0])
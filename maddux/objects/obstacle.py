@@ -1,9 +1,12 @@
 """
 A stationary rectangular solid that something may collide with
 """
+import weakref
 import numpy as np
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 from static import StaticObject
+import geometry
+import ballistics
 
 
 class Obstacle(StaticObject):
@@ -22,9 +25,45 @@ class Obstacle(StaticObject):
 
         :rtype: None
         """
-        self.pt1 = pt1
-        self.pt2 = pt2
+        self._pt1 = pt1
+        self._pt2 = pt2
         self.color = color
+        self._fit()
+
+        # Obstacle sets holding this obstacle, refit whenever it moves
+        self.owners = weakref.WeakSet()
+
+    @property
+    def pt1(self):
+        """The first point (x, y, z) defining the rect"""
+        return self._pt1
+
+    @pt1.setter
+    def pt1(self, pt1):
+        self._pt1 = pt1
+        self._moved()
+
+    @property
+    def pt2(self):
+        """The second point (x, y, z) defining the rect"""
+        return self._pt2
+
+    @pt2.setter
+    def pt2(self, pt2):
+        self._pt2 = pt2
+        self._moved()
+
+    def _fit(self):
+        """Recompute the lower and upper corners of the box, whichever
+        order pt1 and pt2 were given in"""
+        self.lo = np.minimum(self._pt1, self._pt2).astype(float)
+        self.hi = np.maximum(self._pt1, self._pt2).astype(float)
+
+    def _moved(self):
+        """Refit the box and every obstacle set holding it"""
+        self._fit()
+        for owner in list(self.owners):
+            owner.refit(self)
 
     # TODO: Make this use numpy arrays instead of lists
     def get_paths(self):
@@ -64,29 +103,35 @@ class Obstacle(StaticObject):
         :returns: Whether the obstacle was hit by a point or path
         :rtype: bool
         """
-        is_point = len(position.shape) == 1
+        position = np.asarray(position)
+        is_point = position.ndim == 1
 
         if is_point:
             x, y, z = position
         else:
             assert position.shape[1] == 3
-            x = position[:, 0]
-            y = position[:, 1]
-            z = position[:, 2]
+            return bool(np.any(self.are_hit(position)))
 
-        [x1, y1, z1] = self.pt1
-        [x2, y2, z2] = self.pt2
+        [x1, y1, z1] = self.lo
+        [x2, y2, z2] = self.hi
 
         x_hit = (x >= x1) & (x <= x2)
         y_hit = (y >= y1) & (y <= y2)
         z_hit = (z >= z1) & (z <= z2)
 
-        all_hit = x_hit & y_hit & z_hit
+        return (x_hit and y_hit and z_hit)
 
-        if is_point:
-            return (x_hit and y_hit and z_hit)
-        else:
-            return np.any(all_hit)
+    def are_hit(self, points):
+        """Checks which of many points are inside the rectangle
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        points = np.asarray(points)
+        return np.all((points >= self.lo) & (points <= self.hi), axis=-1)
 
     def is_hit_by_sphere(self, center, radius):
         """Checks if the rectangle is hit by a sphere
@@ -101,8 +146,8 @@ class Obstacle(StaticObject):
         :rtype: bool
         """
 
-        [x1, y1, z1] = self.pt1
-        [x2, y2, z2] = self.pt2
+        [x1, y1, z1] = self.lo
+        [x2, y2, z2] = self.hi
         x, y, z = center
 
         x_hit = (x + radius >= x1) & (x - radius <= x2)
@@ -111,6 +156,129 @@ class Obstacle(StaticObject):
 
         return x_hit and y_hit and z_hit
 
+    def are_hit_by_spheres(self, centers, radius):
+        """Checks which of many spheres hit the rectangle, using the same
+        test as is_hit_by_sphere
+
+        :param centers: Mx3 sphere centers
+        :type centers: numpy.ndarray
+
+        :param radius: Sphere radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        centers = np.asarray(centers, dtype=float)
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis]
+        return np.all((centers + radius >= self.lo) &
+                      (centers - radius <= self.hi), axis=-1)
+
+    def is_hit_by_capsule(self, start, end, radius):
+        """Checks exactly if the rectangle is hit by a capsule, i.e. the
+        segment from start to end grown by radius
+
+        :param start: Start (x, y, z) of the capsule's segment
+        :type start: numpy.ndarray
+
+        :param end: End (x, y, z) of the capsule's segment
+        :type end: numpy.ndarray
+
+        :param radius: The capsule's radius
+        :type radius: float
+
+        :returns: Whether obstacle was hit by the capsule
+        :rtype: bool
+        """
+        return geometry.capsule_hits_box(start, end, radius,
+                                         self.lo, self.hi)
+
+    def is_hit_by_capsules(self, starts, ends, radius):
+        """Checks exactly which of many capsules hit the rectangle
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask of capsules hitting the obstacle
+        :rtype: numpy.ndarray
+        """
+        return geometry.capsules_hit_boxes(starts, ends, radius,
+                                           self.lo, self.hi)
+
+    def distance_to_capsule(self, start, end, radius):
+        """Signed distance from a capsule to the rectangle, negative by
+        the depth they overlap if the capsule hits it
+
+        :param start: Start (x, y, z) of the capsule's segment
+        :type start: numpy.ndarray
+
+        :param end: End (x, y, z) of the capsule's segment
+        :type end: numpy.ndarray
+
+        :param radius: The capsule's radius
+        :type radius: float
+
+        :rtype: float
+        """
+        return float(geometry.capsule_box_distances(start, end, radius,
+                                                    self.lo, self.hi))
+
+    def distances_to_capsules(self, starts, ends, radius):
+        """Signed distance from each of many capsules to the rectangle
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M signed distances
+        :rtype: numpy.ndarray
+        """
+        return geometry.capsule_box_distances(starts, ends, radius,
+                                              self.lo, self.hi)
+
+    def signed_distances(self, points):
+        """Signed distance from points to the rectangle, negative inside it
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: M signed distances
+        :rtype: numpy.ndarray
+        """
+        return geometry.point_box_distances(points, self.lo, self.hi)
+
+    def time_of_impact(self, position, velocity, gravity):
+        """Earliest time a projectile thrown from position with velocity
+        is inside the rectangle
+
+        :param position: The projectile's position (x, y, z)
+        :type position: numpy.ndarray
+
+        :param velocity: The projectile's velocity (vx, vy, vz)
+        :type velocity: numpy.ndarray
+
+        :param gravity: Acceleration along z
+        :type gravity: float
+
+        :returns: The time in seconds, or inf if it never hits
+        :rtype: float
+        """
+        return ballistics.box_impact_time(position, velocity, self.lo,
+                                          self.hi, gravity)
+
     def display(self):
         """Display obstacle properties
 
@@ -0,0 +1,504 @@
+"""
+An array backed collection of rectangular obstacles that answers hit
+queries against every box at once.
+"""
+import numpy as np
+import geometry
+import ballistics
+from broadphase import UniformGrid
+
+# Point tests are so cheap that below this many boxes testing every box
+# at once beats looking up the nearby ones in the grid
+POINT_GRID_MIN_OBSTACLES = 1024
+
+
+class ObstacleSet:
+
+    def __init__(self, obstacles=None, dimensions=None, cell_size=None):
+        """Stack the bounds of many obstacles into one Kx2x3 array
+
+        :param obstacles: (Optional) The obstacles in the set
+        :type obstacles: list of maddux.objects.Obstacle or None
+
+        :param dimensions: (Optional) Size (x, y, z) of the space to cover
+                           with a broadphase grid. Without it every query
+                           tests every box.
+        :type dimensions: numpy.ndarray or None
+
+        :param cell_size: (Optional) Edge length of the grid cells
+        :type cell_size: float or None
+
+        :rtype: None
+        """
+        self.obstacles = list(obstacles) if obstacles else []
+        # Bumped on every change so cached results can tell they are stale
+        self.version = 0
+        self.grid = None
+        if dimensions is not None:
+            self.grid = UniformGrid(dimensions, cell_size)
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.obstacles)
+
+    def __iter__(self):
+        return iter(self.obstacles)
+
+    def rebuild(self):
+        """Recompute the bounds array from the obstacles
+
+        :rtype: None
+        """
+        self.version += 1
+        self.bounds = np.zeros((len(self.obstacles), 2, 3))
+        for k, obstacle in enumerate(self.obstacles):
+            obstacle.owners.add(self)
+            self.bounds[k, 0] = obstacle.lo
+            self.bounds[k, 1] = obstacle.hi
+
+        if self.grid is not None:
+            self.grid = UniformGrid(self.grid.dimensions, self.grid.cell_size)
+            for k, (lo, hi) in enumerate(self.bounds):
+                self.grid.insert(k, lo, hi)
+
+    @property
+    def lo(self):
+        """Kx3 lower corners of every box"""
+        return self.bounds[:, 0]
+
+    @property
+    def hi(self):
+        """Kx3 upper corners of every box"""
+        return self.bounds[:, 1]
+
+    def add(self, obstacle):
+        """Add an obstacle to the set
+
+        :param obstacle: The obstacle to add
+        :type obstacle: maddux.objects.Obstacle
+
+        :rtype: None
+        """
+        self.version += 1
+        self.obstacles.append(obstacle)
+        obstacle.owners.add(self)
+        box = np.array([[obstacle.lo, obstacle.hi]])
+        self.bounds = np.concatenate((self.bounds, box))
+        if self.grid is not None:
+            self.grid.insert(len(self.obstacles) - 1, obstacle.lo, obstacle.hi)
+
+    def remove(self, obstacle):
+        """Remove an obstacle from the set. The last obstacle moves into
+        the freed slot, so only it has to be reindexed.
+
+        :param obstacle: The obstacle to remove
+        :type obstacle: maddux.objects.Obstacle
+
+        :rtype: None
+        """
+        self.version += 1
+        k = self.obstacles.index(obstacle)
+        last = len(self.obstacles) - 1
+        if self.obstacles.count(obstacle) == 1:
+            obstacle.owners.discard(self)
+
+        if self.grid is not None:
+            self.grid.remove(k)
+            if k != last:
+                self.grid.remove(last)
+                self.grid.insert(k, self.bounds[last, 0], self.bounds[last, 1])
+
+        self.obstacles[k] = self.obstacles[last]
+        self.bounds[k] = self.bounds[last]
+        del self.obstacles[last]
+        self.bounds = self.bounds[:last].copy()
+
+    def refit(self, obstacle):
+        """Update the set after an obstacle moved. Obstacles call this
+        themselves when their pt1 or pt2 is set.
+
+        :param obstacle: The obstacle that moved
+        :type obstacle: maddux.objects.Obstacle
+
+        :rtype: None
+        """
+        self.version += 1
+        for k, held in enumerate(self.obstacles):
+            if held is obstacle:
+                self.bounds[k, 0] = obstacle.lo
+                self.bounds[k, 1] = obstacle.hi
+                if self.grid is not None:
+                    self.grid.update(k, obstacle.lo, obstacle.hi)
+
+    def candidates(self, lo, hi):
+        """Indices of the boxes that may overlap a query bounding box
+
+        :param lo: Lower corner (x, y, z) of the query box
+        :type lo: numpy.ndarray
+
+        :param hi: Upper corner (x, y, z) of the query box
+        :type hi: numpy.ndarray
+
+        :returns: Sorted box indices
+        :rtype: numpy.ndarray
+        """
+        if self.grid is None:
+            return np.arange(len(self.obstacles))
+        return np.array(sorted(self.grid.query(lo, hi)), dtype=int)
+
+    def points_hit(self, points):
+        """Which boxes contain each point
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: MxK boolean mask
+        :rtype: numpy.ndarray
+        """
+        points = np.asarray(points, dtype=float)[:, np.newaxis]
+        return np.all((points >= self.lo) & (points <= self.hi), axis=-1)
+
+    def are_hit(self, points):
+        """Which points (e.g. the steps of a path) are inside any box.
+        With many boxes, only the ones near the points are tested.
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        points = np.asarray(points, dtype=float)
+        if not len(points):
+            return np.zeros(0, dtype=bool)
+        if self.grid is None or len(self.obstacles) < POINT_GRID_MIN_OBSTACLES:
+            return np.any(self.points_hit(points), axis=1)
+
+        idx = self.candidates(points.min(axis=0), points.max(axis=0))
+        points = points[:, np.newaxis]
+        return np.any(np.all((points >= self.lo[idx]) &
+                             (points <= self.hi[idx]), axis=-1), axis=1)
+
+    def first_hit(self, path):
+        """Index of the first point along a path inside any box
+
+        :param path: Mx3 points
+        :type path: numpy.ndarray
+
+        :returns: Index of the first hitting point, or -1 if none hit
+        :rtype: int
+        """
+        hits = self.are_hit(path)
+        if not np.any(hits):
+            return -1
+        return int(np.argmax(hits))
+
+    def is_hit(self, position):
+        """Checks if any box is hit by a point or path
+
+        :param position: A point (x, y, z) or an Mx3 path
+        :type position: numpy.ndarray
+
+        :rtype: bool
+        """
+        return bool(np.any(self.are_hit(np.atleast_2d(position))))
+
+    def spheres_hit(self, centers, radius):
+        """Which boxes each sphere hits, using the same bounding box test
+        as Obstacle.is_hit_by_sphere
+
+        :param centers: Mx3 sphere centers
+        :type centers: numpy.ndarray
+
+        :param radius: Sphere radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: MxK boolean mask
+        :rtype: numpy.ndarray
+        """
+        centers = np.asarray(centers, dtype=float)[:, np.newaxis]
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis, np.newaxis]
+        return np.all((centers + radius >= self.lo) &
+                      (centers - radius <= self.hi), axis=-1)
+
+    def is_hit_by_sphere(self, center, radius):
+        """Checks if any box is hit by a sphere
+
+        :param center: Sphere's center (x, y, z)
+        :type center: numpy.ndarray
+
+        :param radius: The sphere's radius
+        :type radius: float
+
+        :rtype: bool
+        """
+        return bool(self.are_hit_by_spheres(np.atleast_2d(center),
+                                            radius)[0])
+
+    def are_hit_by_spheres(self, centers, radius):
+        """Checks which spheres hit any box. Only boxes near the spheres
+        are tested.
+
+        :param centers: Mx3 sphere centers
+        :type centers: numpy.ndarray
+
+        :param radius: Sphere radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        centers = np.asarray(centers, dtype=float)
+        if not len(centers):
+            return np.zeros(0, dtype=bool)
+
+        reach = np.max(radius)
+        idx = self.candidates(centers.min(axis=0) - reach,
+                              centers.max(axis=0) + reach)
+
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis, np.newaxis]
+        centers = centers[:, np.newaxis]
+        return np.any(np.all((centers + radius >= self.lo[idx]) &
+                             (centers - radius <= self.hi[idx]), axis=-1),
+                      axis=1)
+
+    def segment_distances(self, starts, ends):
+        """Exact distance from each segment to each box
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :returns: MxK distances
+        :rtype: numpy.ndarray
+        """
+        starts = np.asarray(starts, dtype=float)[:, np.newaxis]
+        ends = np.asarray(ends, dtype=float)[:, np.newaxis]
+        return geometry.segment_box_distances(starts, ends, self.lo, self.hi)
+
+    def capsules_hit(self, starts, ends, radius):
+        """Which boxes each capsule hits
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: MxK boolean mask
+        :rtype: numpy.ndarray
+        """
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis]
+        return self.segment_distances(starts, ends) <= radius
+
+    def is_hit_by_capsules(self, starts, ends, radius):
+        """Checks which capsules hit any box
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        if not len(starts):
+            return np.zeros(0, dtype=bool)
+
+        # Only boxes near the capsules' combined bounding box can be hit
+        reach = np.max(radius)
+        idx = self.candidates(np.minimum(starts, ends).min(axis=0) - reach,
+                              np.maximum(starts, ends).max(axis=0) + reach)
+
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis]
+        distances = geometry.segment_box_distances(
+            starts[:, np.newaxis], ends[:, np.newaxis],
+            self.lo[idx], self.hi[idx])
+        return np.any(distances <= radius, axis=1)
+
+    def is_hit_by_capsule(self, start, end, radius):
+        """Checks if any box is hit by a capsule
+
+        :param start: Start (x, y, z) of the capsule's segment
+        :type start: numpy.ndarray
+
+        :param end: End (x, y, z) of the capsule's segment
+        :type end: numpy.ndarray
+
+        :param radius: The capsule's radius
+        :type radius: float
+
+        :rtype: bool
+        """
+        return bool(self.is_hit_by_capsules(np.atleast_2d(start),
+                                            np.atleast_2d(end), radius)[0])
+
+    def capsule_distances(self, starts, ends, radius):
+        """Signed distance from each capsule to each box
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: MxK signed distances
+        :rtype: numpy.ndarray
+        """
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis]
+        starts = np.asarray(starts, dtype=float)[:, np.newaxis]
+        ends = np.asarray(ends, dtype=float)[:, np.newaxis]
+        return geometry.capsule_box_distances(starts, ends, radius,
+                                              self.lo, self.hi)
+
+    def closest_to_capsules(self, starts, ends, radius, max_distance=None):
+        """Find the nearest box to each capsule along with the closest
+        point pair between them
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :param max_distance: (Optional) Ignore boxes further than this
+                             from every capsule, which lets the broadphase
+                             skip them. Capsules with no box in range get
+                             an infinite distance, index -1 and nan points.
+        :type max_distance: float or None
+
+        :returns: M signed distances, M box indices, Mx3 points on the
+                  capsules and Mx3 points on the boxes
+        :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray,
+                 numpy.ndarray)
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        M = len(starts)
+
+        idx = np.arange(len(self.obstacles))
+        if max_distance is not None and M:
+            reach = np.max(radius) + max_distance
+            idx = self.candidates(np.minimum(starts, ends).min(axis=0) - reach,
+                                  np.maximum(starts, ends).max(axis=0) + reach)
+
+        distances = np.full(M, np.inf)
+        nearest = np.full(M, -1, dtype=int)
+        capsule_points = np.full((M, 3), np.nan)
+        box_points = np.full((M, 3), np.nan)
+        if not idx.size or not M:
+            return distances, nearest, capsule_points, box_points
+
+        radius = np.asarray(radius, dtype=float)
+        if radius.ndim:
+            radius = radius[:, np.newaxis]
+        d, on_capsule, on_box = geometry.capsule_box_closest_points(
+            starts[:, np.newaxis], ends[:, np.newaxis], radius,
+            self.lo[idx], self.hi[idx])
+
+        best = np.argmin(d, axis=1)
+        rows = np.arange(M)
+        found = d[rows, best]
+        if max_distance is not None:
+            found = np.where(found <= max_distance, found, np.inf)
+        hit = np.isfinite(found)
+
+        distances[hit] = found[hit]
+        nearest[hit] = idx[best[hit]]
+        capsule_points[hit] = on_capsule[rows, best][hit]
+        box_points[hit] = on_box[rows, best][hit]
+        return distances, nearest, capsule_points, box_points
+
+    def distance_to_capsule(self, start, end, radius):
+        """Signed distance from a capsule to the nearest box
+
+        :param start: Start (x, y, z) of the capsule's segment
+        :type start: numpy.ndarray
+
+        :param end: End (x, y, z) of the capsule's segment
+        :type end: numpy.ndarray
+
+        :param radius: The capsule's radius
+        :type radius: float
+
+        :returns: The signed distance, or inf if the set is empty
+        :rtype: float
+        """
+        return float(self.distances_to_capsules(np.atleast_2d(start),
+                                                np.atleast_2d(end),
+                                                radius)[0])
+
+    def distances_to_capsules(self, starts, ends, radius):
+        """Signed distance from each capsule to the nearest box
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M signed distances, inf where the set is empty
+        :rtype: numpy.ndarray
+        """
+        return self.closest_to_capsules(starts, ends, radius)[0]
+
+    def time_of_impact(self, position, velocity, gravity):
+        """Earliest time a projectile thrown from position with velocity
+        is inside any box
+
+        :param position: The projectile's position (x, y, z)
+        :type position: numpy.ndarray
+
+        :param velocity: The projectile's velocity (vx, vy, vz)
+        :type velocity: numpy.ndarray
+
+        :param gravity: Acceleration along z
+        :type gravity: float
+
+        :returns: The time in seconds, or inf if it never hits
+        :rtype: float
+        """
+        return min([ballistics.box_impact_time(position, velocity, lo, hi,
+                                               gravity)
+                    for lo, hi in self.bounds] or [float('inf')])
+
+    def plot(self, ax):
+        """Plots every obstacle in the set
+
+        :param ax: Figure to plot on
+        :type ax: matplotlib.axes
+
+        :rtype: None
+        """
+        for obstacle in self.obstacles:
+            obstacle.plot(ax)
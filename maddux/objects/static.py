@@ -3,6 +3,7 @@ An abstract base class for static objects.
 """
 import abc
 import numpy as np
+import ballistics
 
 
 class StaticObject:
@@ -13,6 +14,158 @@ class StaticObject:
         """Tells whether another object hit the static object"""
         return
 
+    def are_hit(self, points):
+        """Tells which of many points hit the static object. By default
+        this checks each point with is_hit; subclasses can do better.
+
+        :param points: Mx3 points, e.g. the steps of a path
+        :type points: numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        return np.array([self.is_hit(point) for point in points], dtype=bool)
+
+    def first_hit(self, path):
+        """Index of the first point along a path that hits the static
+        object
+
+        :param path: Mx3 points
+        :type path: numpy.ndarray
+
+        :returns: Index of the first hitting point, or -1 if none hit
+        :rtype: int
+        """
+        hits = self.are_hit(path)
+        if not np.any(hits):
+            return -1
+        return int(np.argmax(hits))
+
+    def is_hit_by_sphere(self, center, radius):
+        """Tells whether a sphere hits the static object
+
+        :param center: Sphere's center (x, y, z)
+        :type center: numpy.ndarray
+
+        :param radius: The sphere's radius
+        :type radius: float
+
+        :rtype: bool
+        """
+        return bool(self.are_hit_by_spheres(np.atleast_2d(center),
+                                            radius)[0])
+
+    def are_hit_by_spheres(self, centers, radius):
+        """Tells which of many spheres hit the static object. By default
+        this uses signed_distances, so only objects with a known shape
+        support it.
+
+        :param centers: Mx3 sphere centers
+        :type centers: numpy.ndarray
+
+        :param radius: Sphere radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        return self.signed_distances(centers) <= radius
+
+    def is_hit_by_capsule(self, start, end, radius):
+        """Tells whether a capsule (a segment grown by a radius) hits the
+        static object. By default this checks a sphere at the start (if
+        the object has signed distances) and points sampled along the
+        segment; subclasses can do better.
+
+        :param start: Start (x, y, z) of the capsule's segment
+        :type start: numpy.ndarray
+
+        :param end: End (x, y, z) of the capsule's segment
+        :type end: numpy.ndarray
+
+        :param radius: The capsule's radius
+        :type radius: float
+
+        :rtype: bool
+        """
+        try:
+            if self.is_hit_by_sphere(start, radius):
+                return True
+        except NotImplementedError:
+            # Without signed distances only the segment itself is checked
+            pass
+
+        lamb = np.linspace(0, 1, 100)
+        positions = start + lamb[:, np.newaxis] * (end - start)
+        return bool(np.any(self.are_hit(positions)))
+
+    def is_hit_by_capsules(self, starts, ends, radius):
+        """Tells which of many capsules hit the static object
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        radius = np.broadcast_to(radius, (len(starts),))
+        return np.array([self.is_hit_by_capsule(start, end, r)
+                         for start, end, r in zip(starts, ends, radius)],
+                        dtype=bool)
+
+    def signed_distances(self, points):
+        """Signed distance from points to the static object, negative
+        inside it. Only objects with a known shape support this.
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: M signed distances
+        :rtype: numpy.ndarray
+        """
+        raise NotImplementedError(
+            "{} has no signed distances".format(type(self).__name__))
+
+    def time_of_impact(self, position, velocity, gravity, step=0.001,
+                       horizon=60.0):
+        """Earliest time a projectile thrown from position with velocity
+        hits the static object. By default this samples the path every
+        step seconds with are_hit; subclasses can solve for it exactly.
+
+        :param position: The projectile's position (x, y, z)
+        :type position: numpy.ndarray
+
+        :param velocity: The projectile's velocity (vx, vy, vz)
+        :type velocity: numpy.ndarray
+
+        :param gravity: Acceleration along z
+        :type gravity: float
+
+        :param step: (Default: one ms) Time between samples
+        :type step: float
+
+        :param horizon: (Default: 60) How far ahead to look in seconds
+        :type horizon: float
+
+        :returns: The time in seconds, or inf if it never hits
+        :rtype: float
+        """
+        # Sample about a second of the path at a time
+        n = max(1, int(round(1.0 / step)))
+        for start in xrange(0, int(np.ceil(horizon / step)), n):
+            ts = np.arange(start, start + n) * step
+            hits = self.are_hit(ballistics.position_at(position, velocity,
+                                                       ts, gravity))
+            if np.any(hits):
+                return float(ts[np.argmax(hits)])
+        return float('inf')
+
     @abc.abstractmethod
     def display(self):
         """Display relevant data about static object."""
@@ -3,6 +3,8 @@ A stationary object that something may collide with.
 """
 from static import StaticObject
 import numpy as np
+import geometry
+import ballistics
 
 HIT_ERROR = 0.01
 
@@ -28,11 +30,15 @@ class Target(StaticObject):
     def is_hit(self, position):
         """Check if the target is hit.
 
-        :param position: A object's position
+        :param position: A object's position (x, y, z) or an Mx3 path
         :type position: numpy.array
 
         :rtype: Boolean
         """
+        position = np.asarray(position)
+        if position.ndim > 1:
+            return bool(np.any(self.are_hit(position)))
+
         diff = np.absolute(position - self.position)
 
         x_hit = diff[0] <= self.radius
@@ -40,6 +46,95 @@ class Target(StaticObject):
         z_hit = diff[2] <= self.radius
         return x_hit and y_hit and z_hit
 
+    def are_hit(self, points):
+        """Check which of many points hit the target
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        diff = np.absolute(np.asarray(points) - self.position)
+        return ((diff[:, 0] <= self.radius) & (diff[:, 1] <= HIT_ERROR) &
+                (diff[:, 2] <= self.radius))
+
+    def signed_distances(self, points):
+        """Signed distance from points to the region counted as hitting
+        the target, a thin box around its disc
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :returns: M signed distances
+        :rtype: numpy.ndarray
+        """
+        lo, hi = self._box()
+        return geometry.point_box_distances(points, lo, hi)
+
+    def is_hit_by_capsule(self, start, end, radius):
+        """Tells whether a capsule hits the region counted as hitting the
+        target
+
+        :param start: Start (x, y, z) of the capsule's segment
+        :type start: numpy.ndarray
+
+        :param end: End (x, y, z) of the capsule's segment
+        :type end: numpy.ndarray
+
+        :param radius: The capsule's radius
+        :type radius: float
+
+        :rtype: bool
+        """
+        return bool(self.is_hit_by_capsules([start], [end], radius)[0])
+
+    def is_hit_by_capsules(self, starts, ends, radius):
+        """Tells which of many capsules hit the region counted as hitting
+        the target
+
+        :param starts: Mx3 segment starts
+        :type starts: numpy.ndarray
+
+        :param ends: Mx3 segment ends
+        :type ends: numpy.ndarray
+
+        :param radius: Capsule radius, or M radii
+        :type radius: float or numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        lo, hi = self._box()
+        return geometry.capsule_box_distances(
+            np.asarray(starts, dtype=float), np.asarray(ends, dtype=float),
+            radius, lo, hi) <= 0
+
+    def time_of_impact(self, position, velocity, gravity):
+        """Earliest time a projectile thrown from position with velocity
+        hits the target
+
+        :param position: The projectile's position (x, y, z)
+        :type position: numpy.ndarray
+
+        :param velocity: The projectile's velocity (vx, vy, vz)
+        :type velocity: numpy.ndarray
+
+        :param gravity: Acceleration along z
+        :type gravity: float
+
+        :returns: The time in seconds, or inf if it never hits
+        :rtype: float
+        """
+        lo, hi = self._box()
+        return ballistics.box_impact_time(position, velocity, lo, hi, gravity)
+
+    def _box(self):
+        """Lower and upper corners of the thin box around the target's
+        disc that counts as hitting it"""
+        extent = np.array([self.radius, HIT_ERROR, self.radius], dtype=float)
+        return self.position - extent, self.position + extent
+
     def display(self):
         """
         Display target properties
@@ -4,19 +4,56 @@ velocity, etc.
 """
 import numpy as np
 from dynamic import DynamicObject
+from maddux.integrators import SemiImplicitEuler, constant
+import ballistics
 
 GRAVITY = -9.81
 TIME = 0.001
 
+# Thrown objects only feel gravity
+ACCEL = constant(np.array([0.0, 0.0, GRAVITY]))
+
 
 class ThrowableObject(DynamicObject):
 
     def __init__(self, position, target=False):
         """Throwable Object Init"""
+        DynamicObject.__init__(self, position, target)
         self.attached = True
-        self.target = target
         self.velocity = np.array([0, 0, 0])
-        DynamicObject.__init__(self, position, target)
+
+        # How step moves the object while it is not in a
+        # DynamicObjectArray (which has an integrator of its own)
+        self.integrator = SemiImplicitEuler()
+
+    @property
+    def velocity(self):
+        """Current velocity (vx, vy, vz). A view into the array's
+        velocities while the object belongs to a DynamicObjectArray."""
+        if self.array is None:
+            return self._velocity
+        return self.array.velocities[self.index]
+
+    @velocity.setter
+    def velocity(self, velocity):
+        if self.array is None:
+            self._velocity = velocity
+        else:
+            self.array.velocities[self.index] = velocity
+
+    @property
+    def attached(self):
+        """Whether the object is held or stuck rather than flying"""
+        if self.array is None:
+            return self._attached
+        return bool(self.array.attached[self.index])
+
+    @attached.setter
+    def attached(self, attached):
+        if self.array is None:
+            self._attached = attached
+        else:
+            self.array.attached[self.index] = attached
 
     def throw(self, velocity):
         """Throw an object.
@@ -29,13 +66,46 @@ class ThrowableObject(DynamicObject):
         self.attached = False
         self.velocity = np.array(velocity)
 
-    def step(self):
-        """Update one timestep (one ms)"""
+    def step(self, time=TIME):
+        """Update one timestep
+
+        :param time: (Default: one ms) Length of the step in seconds
+        :type time: float
+
+        :rtype: None
+        """
         if not self.attached:
-            self.velocity[2] += TIME * GRAVITY
-            self.position += TIME * self.velocity
-            self.positions = np.vstack((self.positions,
-                                        self.position.copy()))
+            self.position, self.velocity = self.integrator.step(
+                ACCEL, self.position, self.velocity, time)
+            self.history().append(self.position)
+
+    def advance(self, duration, sample_step=None):
+        """Move along the exact ballistic path for a duration instead of
+        stepping one ms at a time. Only the end position is recorded in
+        positions unless sample_step asks for samples along the way.
+
+        :param duration: Time to advance by in seconds
+        :type duration: float
+
+        :param sample_step: (Optional) Time between recorded samples
+        :type sample_step: float or None
+
+        :rtype: None
+        """
+        if self.attached:
+            return
+
+        position = np.array(self.position, dtype=float)
+        velocity = np.array(self.velocity, dtype=float)
+        if sample_step is not None:
+            ts = np.arange(sample_step, duration, sample_step)
+            samples = ballistics.position_at(position, velocity, ts, GRAVITY)
+            self.history().extend(samples)
+
+        self.position = ballistics.position_at(position, velocity, duration,
+                                               GRAVITY)
+        self.velocity = ballistics.velocity_at(velocity, duration, GRAVITY)
+        self.history().append(self.position)
 
     def attach(self):
         """Attach an object to its current position"""
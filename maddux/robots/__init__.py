@@ -1,3 +1,4 @@
 from link import Link
 from arm import Arm
+from chain import KinematicChain
 from predefined_robots import simple_human_arm, noodle_arm
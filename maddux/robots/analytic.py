@@ -0,0 +1,98 @@
+"""
+Closed form inverse kinematics for arms with a known layout.
+"""
+import math
+import numpy as np
+
+
+def wrap_angle(theta):
+    """Wrap an angle into [-pi, pi]
+
+    :param theta: The angle to wrap
+    :type theta: float
+
+    :rtype: float
+    """
+    return math.atan2(math.sin(theta), math.cos(theta))
+
+
+class SimpleHumanArmIK:
+
+    def __init__(self, seg1_len, seg2_len):
+        """Position inverse kinematics for the simple_human_arm layout: a
+        spherical shoulder (links 1-3), an elbow (link 4) and a wrist
+        (links 5-7) that does not move the end effector.
+
+        :param seg1_len: Length of the upper arm
+        :type seg1_len: float
+
+        :param seg2_len: Length of the forearm
+        :type seg2_len: float
+
+        :rtype: None
+        """
+        self.seg1_len = float(seg1_len)
+        self.seg2_len = float(seg2_len)
+
+    def solve(self, arm, p, q=None, swivel=0.0):
+        """Find every elbow and shoulder branch reaching a point. The
+        shoulder is redundant for position, so the upper arm rotation
+        (joint 3) is fixed to the swivel angle. The wrist joints are kept
+        from q.
+
+        :param arm: The arm to solve for
+        :type arm: maddux.robots.Arm
+
+        :param p: The point (x, y, z) to solve for
+        :type p: numpy.ndarray
+
+        :param q: (Optional) Joint configuration to take the wrist angles
+                  from. Defaults to the arm's current configuration.
+        :type q: numpy.ndarray or None
+
+        :param swivel: (Default: 0.0) Angle of joint 3
+        :type swivel: float
+
+        :returns: Kx7 array of solutions (K is between 0 and 4)
+        :rtype: numpy.ndarray
+        """
+        if q is None:
+            q = arm.get_current_joint_config()
+
+        l1 = self.seg1_len
+        l2 = self.seg2_len
+        rx, ry, rz = np.asarray(p, dtype=float) - arm.base[0:3, 3]
+
+        # The elbow angle alone sets the shoulder to hand distance
+        s = (l1 ** 2 + l2 ** 2 - (rx ** 2 + ry ** 2 + rz ** 2)) / (2 * l1 * l2)
+        if abs(s) > 1:
+            return np.zeros((0, arm.num_links))
+        elbows = set([math.asin(s), wrap_angle(math.pi - math.asin(s))])
+
+        solutions = []
+        for t4 in elbows:
+            # Hand position in the upper arm frame, rotated by the swivel
+            hx = l2 * math.cos(t4)
+            hy = l2 * math.sin(t4) - l1
+            cx = hx * math.cos(swivel)
+            cy = hx * math.sin(swivel)
+            cz = -hy
+
+            # Shoulder pitch must lift the hand to the target's height
+            radius = math.hypot(cx, cz)
+            if radius == 0 or abs(rz) > radius:
+                continue
+            psi = math.atan2(cx, cz)
+            delta = math.acos(rz / radius)
+
+            for t2 in set([psi + delta, psi - delta]):
+                # Shoulder yaw then turns the hand onto the target
+                wx = math.cos(t2) * cx - math.sin(t2) * cz
+                t1 = math.atan2(ry, rx) - math.atan2(cy, wx)
+
+                solution = np.array(q, dtype=float)
+                solution[0:4] = [wrap_angle(t1), wrap_angle(t2),
+                                 wrap_angle(swivel), t4]
+                solutions.append(solution)
+
+        return np.array(solutions).reshape((-1, arm.num_links))
@@ -3,9 +3,16 @@ A robot arm defined by a sequence of DH links
 """
 import numpy as np
 import utils
+import ik
+from chain import KinematicChain
+from ik_cache import IKCache
+from config_cache import ConfigurationCache
+from maddux.utils.trajectory import TrajectoryBuffer
+import reachability as reachability_module
+from maddux.objects import geometry, ObstacleSet
 
 
-class Arm:
+class Arm(object):
 
     # TODO: Do something about active_links, its real bad...
     # TODO: Make sure the tool frame works
@@ -35,6 +42,7 @@ class Arm:
         """
         self.num_links = links.size
         self.links = links
+        self.chain = KinematicChain(links)
         self.q0 = q0
         self.name = name
 
@@ -59,12 +67,49 @@ class Arm:
         self.held_objects = []
 
         # A cache of all past q values for a run of ikine so we
-        # can animate the action
-        self.qs = np.array([q0.copy()])
+        # can animate the action, read through qs
+        self._qs = TrajectoryBuffer([q0])
+
+        # Number of iterations the last call to ikine used
+        self.ik_iterations = 0
+
+        # Optional cache of past ikine solutions, see enable_ik_cache
+        self.ik_cache = None
+
+        # Optional memo of link positions and collision results per
+        # visited configuration, see enable_config_cache
+        self.config_cache = None
+
+        # Optional map of reachable positions, see set_reachability_map
+        self.reachability = None
+
+        # Optional closed form solver for this arm's layout, used by
+        # ikine(solver='analytic'). Set by the predefined robots.
+        self.analytic_solver = None
+
+        # NxN mask of the link pairs worth checking for self collision,
+        # built on first use by build_self_collision_filter
+        self.self_collision_filter = None
+
+        # Cumulative world frame at the end of each link, along with the
+        # joint angles they were computed from. Frames from _dirty_link
+        # onwards are stale and get rebuilt by update_link_positions
+        self.frames = np.zeros((self.num_links, 4, 4))
+        self._frame_q = np.zeros(self.num_links)
+        self._dirty_link = 0
 
         # Set the arm to its default position
         self.reset()
 
+    @property
+    def qs(self):
+        """Read only MxN array of the saved joint configurations"""
+        return self._qs.array
+
+    @qs.setter
+    def qs(self, qs):
+        self._qs.reset(qs)
+
     def reset(self):
         """Resets the arm back to its resting state, i.e. q0
 
@@ -78,10 +123,7 @@ class Arm:
         :returns: 1xN vector of current joint config
         :rtype: numpy.ndarray
         """
-        q = np.zeros(self.num_links)
-        for i, link in enumerate(self.links):
-            q[i] = link.theta
-        return q
+        return self.chain.q.copy()
 
     def update_angles(self, new_angles, save=False):
         """Updates all the link's angles
@@ -99,8 +141,7 @@ class Arm:
         self.update_link_positions()
 
         if save:
-            q = np.array([l.theta for l in self.links])
-            self.qs = np.vstack((self.qs, q.copy()))
+            self._qs.append(self.chain.q)
 
     def update_link_angle(self, link, new_angle, save=False):
         """Updates the given link's angle with the given angle
@@ -121,8 +162,7 @@ class Arm:
 
         # Save each config for replay
         if save:
-            q = np.array([l.theta for l in self.links])
-            self.qs = np.vstack((self.qs, q.copy()))
+            self._qs.append(self.chain.q)
 
     # TODO: Acceleration over time seems like a weird way to update this
     def update_link_velocity(self, link, accel, time):
@@ -143,13 +183,59 @@ class Arm:
         self.links[link].update_velocity(accel, time)
         self.update_link_positions()
 
+    def invalidate_frames(self, link=0):
+        """Recompute the cached link frames from the given link onwards,
+        re-reading every link's DH parameters. Only needed when the base,
+        tool or DH parameters are changed by hand, since joint angle
+        changes are detected automatically.
+
+        :param link: (Default: 0) First link whose frame must be recomputed
+        :type link: int
+
+        :rtype: None
+        """
+        self.chain.refresh(self.links)
+        self._dirty_link = min(self._dirty_link, link)
+        if self.config_cache is not None:
+            self.config_cache.clear()
+        self.update_link_positions()
+
     def update_link_positions(self):
-        """Walk through all the links and update their positions.
+        """Update the link positions from the cached frame chain. Only the
+        links from the first changed joint onwards are recomputed, each
+        from its parent frame with a single matrix product.
 
         :rtype: None
         """
+        q = self.chain.q
+        changed = np.flatnonzero(q != self._frame_q)
+        start = self._dirty_link
+        if changed.size:
+            start = min(start, changed[0])
+
+        cached = None
+        if self.config_cache is not None and start < self.num_links:
+            cached = self.config_cache.lookup(q)
+        if cached is not None:
+            # A revisited configuration, so reuse its link positions
+            frames, base_positions, end_positions = cached
+            self.frames[:] = frames
+            for i, link in enumerate(self.links):
+                link.base_pos = base_positions[i].copy()
+                link.end_pos = end_positions[i].copy()
+            start = self.num_links
+
+        tool_pos = np.asarray(self.tool)[:, 3]
+        if start == 0:
+            t = np.asarray(self.base)
+        else:
+            t = self.frames[start - 1]
+
+        for i in range(start, self.num_links):
+            link = self.links[i]
+            t = np.dot(t, self.chain.transforms[i])
+            self.frames[i] = t
 
-        for i, link in enumerate(self.links):
             # Set link base position
             if i == 0:
                 link.base_pos = utils.create_point_from_homogeneous_transform(
@@ -161,17 +247,22 @@ class Arm:
             if link.length == 0 and link.offset == 0:
                 link.end_pos = link.base_pos
             else:
-                # Compute FKine up to that link endpoint
-                # to get the location in homogenous coords
-                t = self.fkine(links=range(i + 1))
-                # Then convert that to world space
-                end_pos = utils.create_point_from_homogeneous_transform(t).T
-                link.end_pos = end_pos.A1
+                # Move the tool point into this link's world frame
+                link.end_pos = np.dot(t[0:3], tool_pos)
+
+        if self.config_cache is not None and cached is None:
+            self.config_cache.insert(
+                q, self.frames,
+                np.reshape([link.base_pos for link in self.links], (-1, 3)),
+                np.reshape([link.end_pos for link in self.links], (-1, 3)))
+
+        self._frame_q = q.copy()
+        self._dirty_link = self.num_links
 
         # After we update all these link positions, we can update
         # the location of any object we are holding
         for held_object in self.held_objects:
-            held_object.position = self.end_effector_position()
+            held_object.position = self.end_effector_position().copy()
 
     def end_effector_position(self, q=None):
         """Return end effector position
@@ -221,21 +312,70 @@ class Arm:
         :rtype: 4x4 numpy.array
         """
         if links is None:
-            links = range(self.num_links)
-
-        t = self.base
-
-        for i, link in zip(links, self.links):
             if np.any(q):
-                t = t * link.compute_transformation_matrix(q[i])
+                A = self.chain.link_transforms(q)
             else:
-                t = t * link.transform_matrix
-        t = t * self.tool
-        return t
-
-    def ikine(self, p, num_iterations=1000, alpha=0.1):
+                A = self.chain.transforms
+        else:
+            # Only the first len(links) links are walked, each with the
+            # joint angle at the matching index of links
+            A = []
+            for i, j in zip(links, range(self.num_links)):
+                if np.any(q):
+                    A.append(self.chain.link_transform(j, q[i]))
+                else:
+                    A.append(self.chain.transforms[j])
+
+        t = np.asarray(self.base, dtype=float)
+        for a in A:
+            t = np.dot(t, a)
+        t = np.dot(t, self.tool)
+        return np.asmatrix(t)
+
+    def fkine_batch(self, Q, return_frames=False):
+        """Computes the forward kinematics for many joint configurations
+        at once. Each link transform is built for every configuration in
+        one array operation, so only the chain walk loops in Python.
+
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :param return_frames: (Default: False) Also return the world frame
+                              at the end of every link
+        :type return_frames: bool
+
+        :returns: Mx4x4 end effector transforms, and MxNx4x4 link frames
+                  if return_frames is set
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        Q = self._as_batch(Q)
+        A = self.chain.link_transforms(Q)
+        frames = self.chain.frames(A, self.base)
+        if self.num_links:
+            T = np.matmul(frames[:, -1], np.asarray(self.tool, dtype=float))
+        else:
+            T = np.tile(np.matmul(self.base, self.tool), (len(Q), 1, 1))
+
+        if return_frames:
+            return T, frames
+        return T
+
+    def _as_batch(self, Q):
+        """Check and convert Q into an MxN array of joint configurations"""
+        Q = np.atleast_2d(np.asarray(Q, dtype=float))
+        if Q.ndim != 2 or Q.shape[1] != self.num_links:
+            raise ValueError('Expected configurations with {} joints'.format(
+                self.num_links), Q.shape)
+        return Q
+
+    def ikine(self, p, num_iterations=1000, alpha=0.1, solver='pinv',
+              damping=1e-2, rel_tol=1e-9):
         """Computes the inverse kinematics to find the correct joint
-        configuration to reach a given point
+        configuration to reach a given point. The number of iterations
+        used is left in ik_iterations. If the ik cache is enabled, an exact
+        hit is returned straight away and otherwise the solver starts from
+        the nearest cached solution. If a reachability map is set, points
+        outside it are rejected before any solving.
 
         :param p: The point (x, y, z) to solve the inverse kinematics for
         :type p: numpy.ndarray
@@ -244,22 +384,68 @@ class Arm:
                                giving up
         :type num_iterations: int
 
-        :param alpha: The stepsize for the ikine solver (0.0 - 1.0)
+        :param alpha: The stepsize for the pinv solver (0.0 - 1.0)
         :type alpha: int
 
+        :param solver: (Default: 'pinv') Either 'pinv' for fixed steps along
+                       the jacobian pseudoinverse, 'lm' for damped least
+                       squares steps with Levenberg-Marquardt damping, or
+                       'analytic' to use the arm's closed form solver
+                       (falling back to 'lm' for arms without one)
+        :type solver: str
+
+        :param damping: (Default: 1e-2) Initial damping of the lm solver
+        :type damping: float
+
+        :param rel_tol: (Default: 1e-9) The lm solver gives up once a step
+                        improves the error by less than this fraction
+        :type rel_tol: float
+
         :returns: 1xN vector of the joint configuration for given point p.
         :rtype: numpy.ndarray
         """
+        if solver not in ik.SOLVERS:
+            raise ValueError('Unknown ikine solver', solver)
+
+        q = self.get_current_joint_config()
+        self._qs.reset([q])
+        self.ik_iterations = 0
+
+        if not self.is_reachable(p):
+            raise ValueError("Could not find solution.")
+
+        if self.ik_cache is not None:
+            cached, exact = self.ik_cache.lookup(p)
+            if cached is not None:
+                q = cached
+                self._qs.append(q)
+            if exact:
+                return q
+
+        if solver == 'analytic':
+            q = self._ikine_analytic(p, q, num_iterations, damping, rel_tol)
+        elif solver == 'lm':
+            q = self._ikine_lm(p, q, num_iterations, damping, rel_tol)
+        else:
+            q = self._ikine_pinv(p, q, num_iterations, alpha)
+
+        if self.ik_cache is not None:
+            self.ik_cache.insert(p, q)
+        return q
+
+    def _ikine_pinv(self, p, q, num_iterations, alpha):
+        """Inverse kinematics by fixed alpha steps along the pseudoinverse
+        of the position jacobian.
+        """
         # Check to make sure alpha is between 0 and 1
         if not (0.0 <= alpha <= 1.0):
             print "Invalid alpha. Defaulting to 0.1"
             alpha = 0.1
 
-        q = self.get_current_joint_config()
-        self.qs = np.array([q.copy()])
-
         goal = utils.create_homogeneous_transform_from_point(p)
         for i in xrange(num_iterations):
+            self.ik_iterations = i + 1
+
             # Calculate position error of the end effector
             curr = self.fkine(q)
             err = goal - curr
@@ -275,12 +461,245 @@ class Arm:
             delta_q = np.linalg.pinv(vel_J) * err
             delta_q = np.squeeze(np.asarray(delta_q))
             q = q + (alpha * delta_q.flatten())
-            self.qs = np.vstack((self.qs, q.copy()))
+            self._qs.append(q)
 
-            if abs(np.linalg.norm(err)) <= 1e-6:
+            if abs(np.linalg.norm(err)) <= ik.POSITION_TOLERANCE:
                 return q
         raise ValueError("Could not find solution.")
 
+    def _ikine_analytic(self, p, q, num_iterations, damping, rel_tol):
+        """Inverse kinematics from the arm's closed form solver. The
+        solution nearest q is polished with the lm solver, which absorbs
+        any mismatch between the ideal layout and the actual DH parameters.
+        """
+        if self.analytic_solver is None:
+            return self._ikine_lm(p, q, num_iterations, damping, rel_tol)
+
+        Q = self.analytic_solver.solve(self, p, q)
+        if not len(Q):
+            raise ValueError("Could not find solution.")
+
+        # Pick the branch closest to where we are, measured on the circle
+        diff = np.arctan2(np.sin(Q - q), np.cos(Q - q))
+        q = Q[np.argmin(np.sum(diff ** 2, axis=1))]
+        self._qs.append(q)
+        return self._ikine_lm(p, q, num_iterations, damping, rel_tol)
+
+    def _ikine_lm(self, p, q, num_iterations, damping, rel_tol):
+        """Levenberg-Marquardt inverse kinematics. Damping shrinks after
+        every step that reduces the error and grows after every rejected
+        step, so the solver takes Gauss-Newton steps when far from a
+        singularity and short gradient steps near one.
+        """
+        p = np.asarray(p, dtype=float)
+        J, T = self.jacob0_batch(q, return_fkine=True)
+        err = p - T[:, 0:3, 3]
+        norm = np.linalg.norm(err)
+
+        for i in xrange(num_iterations):
+            if norm <= ik.POSITION_TOLERANCE:
+                return q
+            self.ik_iterations = i + 1
+
+            step = ik.dls_step(J[:, 0:3], err, np.array([damping]))
+            q_new = q + step[0]
+            J_new, T_new = self.jacob0_batch(q_new, return_fkine=True)
+            err_new = p - T_new[:, 0:3, 3]
+            norm_new = np.linalg.norm(err_new)
+
+            if norm_new < norm:
+                improvement = (norm - norm_new) / norm
+                q, J, err, norm = q_new, J_new, err_new, norm_new
+                self._qs.append(q)
+                damping = max(damping / 10.0, ik.MIN_DAMPING)
+
+                # Progress has stalled without reaching the target
+                if norm > ik.POSITION_TOLERANCE and improvement < rel_tol:
+                    break
+            else:
+                damping *= 10.0
+                if damping > ik.MAX_DAMPING:
+                    break
+
+        if norm <= ik.POSITION_TOLERANCE:
+            return q
+        raise ValueError("Could not find solution.")
+
+    def enable_ik_cache(self, capacity=1024, tolerance=1e-6, cell_size=0.25):
+        """Start caching ikine solutions. Hit and miss counts are kept on
+        the returned cache (also available as ik_cache).
+
+        :param capacity: (Default: 1024) Maximum number of stored solutions
+        :type capacity: int
+
+        :param tolerance: (Default: 1e-6) Distance within which a cached
+                          target is returned without solving
+        :type tolerance: float
+
+        :param cell_size: (Default: 0.25) Grid cell size used to look up
+                          nearby targets
+        :type cell_size: float
+
+        :returns: The new cache
+        :rtype: maddux.robots.ik_cache.IKCache
+        """
+        self.ik_cache = IKCache(capacity, tolerance, cell_size)
+        return self.ik_cache
+
+    def disable_ik_cache(self):
+        """Stop caching ikine solutions and drop the cache
+
+        :rtype: None
+        """
+        self.ik_cache = None
+
+    def enable_config_cache(self, capacity=4096, resolution=1e-6):
+        """Start memoizing link positions and collision results for each
+        visited joint configuration, so revisiting one skips both the
+        forward kinematics and the collision checks. Results assume the
+        base and tool stay put. Only collisions with obstacle sets are
+        cached, since they track their own changes, and invalidate_frames
+        clears the cache. Hit ratios are
+        kept on the returned cache (also available as config_cache).
+
+        :param capacity: (Default: 4096) Maximum number of configurations
+        :type capacity: int
+
+        :param resolution: (Default: 1e-6) Joint angle quantization step
+        :type resolution: float
+
+        :returns: The new cache
+        :rtype: maddux.robots.config_cache.ConfigurationCache
+        """
+        self.config_cache = ConfigurationCache(capacity, resolution)
+        return self.config_cache
+
+    def disable_config_cache(self):
+        """Stop memoizing configurations and drop the cache
+
+        :rtype: None
+        """
+        self.config_cache = None
+
+    def set_reachability_map(self, reachability):
+        """Use a reachability map to reject unreachable ikine targets
+
+        :param reachability: A map built for this arm, or None to stop
+                             checking
+        :type reachability: maddux.robots.reachability.ReachabilityMap
+                            or None
+
+        :rtype: None
+        """
+        if (reachability is not None and
+                reachability.key != reachability_module.arm_key(self)):
+            raise ValueError('Reachability map was built for another arm')
+        self.reachability = reachability
+
+    def is_reachable(self, p):
+        """Whether a point may be reachable. Always True when no
+        reachability map is set.
+
+        :param p: The point (x, y, z)
+        :type p: numpy.ndarray
+
+        :rtype: bool
+        """
+        if self.reachability is None:
+            return True
+        return self.reachability.is_reachable(p)
+
+    def ikine_many(self, P, seeds=None, num_iterations=1000, damping=1e-2,
+                   rel_tol=1e-9):
+        """Computes the inverse kinematics for many points at once using
+        the lm solver on all of them in lock-step. Unlike ikine this does
+        not change the arm's joint configuration or its qs history.
+
+        :param P: Mx3 array of points (x, y, z) to solve for
+        :type P: numpy.ndarray
+
+        :param seeds: (Optional) 1xN or MxN seed configurations. Defaults to
+                      the current joint configuration for every point
+        :type seeds: numpy.ndarray or None
+
+        :param num_iterations: The number of iterations to try per point
+                               before giving up
+        :type num_iterations: int
+
+        :param damping: (Default: 1e-2) Initial damping of the lm solver
+        :type damping: float
+
+        :param rel_tol: (Default: 1e-9) A point is given up on once a step
+                        improves its error by less than this fraction
+        :type rel_tol: float
+
+        :returns: MxN joint configurations, M mask of converged points and
+                  M iteration counts
+        :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        """
+        P = np.atleast_2d(np.asarray(P, dtype=float))
+        if seeds is None:
+            seeds = self.get_current_joint_config()
+        Q0 = np.broadcast_to(self._as_batch(seeds), (len(P), self.num_links))
+
+        return ik.lm_batch(self, P, Q0, num_iterations, damping, rel_tol)
+
+    def ikine_multistart(self, p, num_seeds=16, best=False,
+                         num_iterations=1000, damping=1e-2, rel_tol=1e-9,
+                         rng=None):
+        """Computes the inverse kinematics from several seeds at once and
+        returns a converged solution. The first seed is the current joint
+        configuration and the rest are sampled within the link limits. All
+        seeds run together through the lm solver, so the worst case cost is
+        bounded by num_iterations. The arm's state is not changed.
+
+        :param p: The point (x, y, z) to solve the inverse kinematics for
+        :type p: numpy.ndarray
+
+        :param num_seeds: (Default: 16) Number of seeds to start from, at
+                          least one
+        :type num_seeds: int
+
+        :param best: (Default: False) If False, stop all seeds once any of
+                     them converges. Otherwise let them all finish and
+                     return the solution closest to the current joint config
+        :type best: bool
+
+        :param num_iterations: The number of iterations to try before
+                               giving up
+        :type num_iterations: int
+
+        :param damping: (Default: 1e-2) Initial damping of the lm solver
+        :type damping: float
+
+        :param rel_tol: (Default: 1e-9) A seed is given up on once a step
+                        improves its error by less than this fraction
+        :type rel_tol: float
+
+        :param rng: (Optional) Random state to sample seeds from
+        :type rng: numpy.random.RandomState or None
+
+        :returns: 1xN vector of the joint configuration for given point p.
+        :rtype: numpy.ndarray
+        """
+        if num_seeds < 1:
+            raise ValueError('Expected at least one seed, got {}'.format(
+                num_seeds))
+
+        q = self.get_current_joint_config()
+        seeds = np.vstack((q, ik.sample_configurations(self, num_seeds - 1,
+                                                       rng)))
+        P = np.tile(np.asarray(p, dtype=float), (num_seeds, 1))
+
+        Q, converged, _ = ik.lm_batch(self, P, seeds, num_iterations, damping,
+                                      rel_tol, stop_on_first=not best)
+        if not np.any(converged):
+            raise ValueError("Could not find solution.")
+
+        Q = Q[converged]
+        distance = np.sum((Q - q) ** 2, axis=1)
+        return Q[np.argmin(distance)]
+
     def jacob0(self, q=None):
         """Calculates the jacobian in the world frame by finding it in
         the tool frame and then converting to the world frame.
@@ -297,14 +716,14 @@ class Arm:
 
         # Set up homogeneous transform matrix for the world
         eet = self.fkine(q)
-        rotation = utils.get_rotation_from_homogeneous_transform(eet)
+        rotation = utils.get_rotation_from_homogeneous_transform(eet.A)
         zeros = np.zeros((3, 3))
         a1 = np.hstack((rotation, zeros))
         a2 = np.hstack((zeros, rotation))
 
         # Convert to world frame
-        J = np.vstack((a1, a2)) * J
-        return J
+        J = np.dot(np.vstack((a1, a2)), J)
+        return np.asmatrix(J)
 
     def jacobn(self, q=None):
         """Calculates the jacobian in the tool frame
@@ -315,22 +734,81 @@ class Arm:
         :returns: 6xN Jacobian in the tool frame
         :rtype: numpy.matrix
         """
+        if np.any(q):
+            A = self.chain.link_transforms(q)
+        else:
+            A = self.chain.transforms
+
         J = np.zeros((6, self.num_links))
-        U = self.tool
-        I = range(self.num_links - 1, -1, -1)
+        U = np.asarray(self.tool, dtype=float)
 
-        for i, link in zip(I, self.links[::-1]):
-            if np.any(q):
-                U = link.compute_transformation_matrix(q[i]) * U
-            else:
-                U = link.transform_matrix * U
+        for i in range(self.num_links - 1, -1, -1):
+            U = np.dot(A[i], U)
+            J[0:3, i] = -U[0, 0:3] * U[1, 3] + U[1, 0:3] * U[0, 3]
+            J[3:6, i] = U[2, 0:3]
+        return J
+
+    def jacob0_batch(self, Q, return_fkine=False):
+        """Calculates the world frame jacobian for many joint configurations
+        at once. It shares a single forward pass with fkine_batch, so the
+        end effector transforms come along for free.
+
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :param return_fkine: (Default: False) Also return the Mx4x4 end
+                             effector transforms
+        :type return_fkine: bool
+
+        :returns: Mx6xN jacobians in the world frame, and Mx4x4 end effector
+                  transforms if return_fkine is set
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        T, frames = self.fkine_batch(Q, return_frames=True)
+        M = len(T)
+
+        # Joint i rotates about the z axis of the frame before it
+        z = np.empty((M, self.num_links, 3))
+        p = np.empty((M, self.num_links, 3))
+        if self.num_links:
+            z[:, 0] = self.base[0:3, 2]
+            p[:, 0] = self.base[0:3, 3]
+            z[:, 1:] = frames[:, :-1, 0:3, 2]
+            p[:, 1:] = frames[:, :-1, 0:3, 3]
+
+        r = T[:, np.newaxis, 0:3, 3] - p
+        J = np.empty((M, 6, self.num_links))
+        J[:, 0:3] = np.cross(z, r).transpose(0, 2, 1)
+        J[:, 3:6] = z.transpose(0, 2, 1)
+
+        if return_fkine:
+            return J, T
+        return J
 
-            d = np.array([-U[0, 0] * U[1, 3] + U[1, 0] * U[0, 3],
-                          -U[0, 1] * U[1, 3] + U[1, 1] * U[0, 3],
-                          -U[0, 2] * U[1, 3] + U[1, 2] * U[0, 3]])
-            delta = U[2, 0:3]
+    def jacobn_batch(self, Q, return_fkine=False):
+        """Calculates the tool frame jacobian for many joint configurations
+        at once.
 
-            J[:, i] = np.vstack((d, delta)).flatten()
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :param return_fkine: (Default: False) Also return the Mx4x4 end
+                             effector transforms
+        :type return_fkine: bool
+
+        :returns: Mx6xN jacobians in the tool frame, and Mx4x4 end effector
+                  transforms if return_fkine is set
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        J, T = self.jacob0_batch(Q, return_fkine=True)
+
+        # Rotate both halves back into the tool frame
+        Rt = T[:, 0:3, 0:3].transpose(0, 2, 1)
+        J[:, 0:3] = np.matmul(Rt, J[:, 0:3])
+        J[:, 3:6] = np.matmul(Rt, J[:, 3:6])
+
+        if return_fkine:
+            return J, T
         return J
 
     def hold(self, obj):
@@ -342,7 +820,7 @@ class Arm:
         :rtype: None
         """
         obj.attach()
-        obj.position = self.end_effector_position()
+        obj.position = self.end_effector_position().copy()
         self.held_objects.append(obj)
 
     def release(self, object_idx=None):
@@ -356,26 +834,425 @@ class Arm:
         velocity = self.end_effector_velocity()[0:3]
         if object_idx is None:
             # Release all objects
-            for obj in self.held_objects:
-                obj.throw(velocity)
+            released = self.held_objects
+            self.held_objects = []
         else:
-            # TODO: Replease with End Effector Velocity
-            self.held_objects[object_idx].throw(velocity)
+            released = [self.held_objects.pop(object_idx)]
+
+        # Thrown objects no longer follow the end effector around
+        for obj in released:
+            obj.throw(velocity)
 
     # TODO: Let env_object be any object, not just static
     def is_in_collision(self, env_object):
         """Checks if the arm is in collision with a given object
 
-        :param env_object: The object to check for collisions with
-        :type env_object: maddux.Objects.StaticObject
+        :param env_object: The object (or set of obstacles) to check for
+                           collisions with
+        :type env_object: maddux.objects.StaticObject or
+                          maddux.objects.ObstacleSet
 
         :returns: Whether you hit the env_object
         :rtype: bool
         """
-        for link in self.links:
-            if link.is_in_collision(env_object):
-                return True
-        return False
+        # Only obstacle sets track their own changes, so only their
+        # results can be cached. The key holds the set itself rather than
+        # its id, which could be reused by another object later.
+        if (self.config_cache is None or
+                not isinstance(env_object, ObstacleSet)):
+            return self._is_in_collision(env_object)
+
+        token = ('static', env_object, env_object.version)
+        hit = self.config_cache.lookup_collision(self.chain.q, token)
+        if hit is None:
+            hit = self._is_in_collision(env_object)
+            self.config_cache.insert_collision(self.chain.q, token, hit)
+        return hit
+
+    def _is_in_collision(self, env_object):
+        """is_in_collision without the cache"""
+        starts = np.array([link.base_pos for link in self.links])
+        ends = np.array([link.end_pos for link in self.links])
+        radius = np.array([link.link_size for link in self.links])
+        return bool(np.any(env_object.is_hit_by_capsules(starts, ends,
+                                                         radius)))
+
+    def distance_to(self, env_object):
+        """Signed clearance between the arm and an object: the smallest
+        distance from any link to it, negative if a link overlaps it
+
+        :param env_object: The object (or set of obstacles) to measure
+                           the distance to
+        :type env_object: maddux.objects.Obstacle or
+                          maddux.objects.ObstacleSet
+
+        :returns: The signed distance, or inf for an empty obstacle set
+        :rtype: float
+        """
+        starts = np.array([link.base_pos for link in self.links])
+        ends = np.array([link.end_pos for link in self.links])
+        radius = np.array([link.link_size for link in self.links])
+        return float(np.min(env_object.distances_to_capsules(starts, ends,
+                                                             radius)))
+
+    def closest_points(self, obstacles, q=None, max_distance=None):
+        """Find the closest pair of points between the arm and a set of
+        obstacles, without moving the arm
+
+        :param obstacles: The obstacles to measure against
+        :type obstacles: maddux.objects.ObstacleSet or
+                         list of maddux.objects.Obstacle
+
+        :param q: (Optional) Joint configuration. Defaults to the arm's
+                  current configuration.
+        :type q: numpy.ndarray or None
+
+        :param max_distance: (Optional) Ignore obstacles further away
+        :type max_distance: float or None
+
+        :returns: The signed distance, the (link, obstacle) index pair and
+                  the closest points on the arm and on the obstacle
+        :rtype: (float, numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        """
+        if q is None:
+            q = self.chain.q
+        distances, pairs, arm_points, obstacle_points = self.clearance_batch(
+            np.atleast_2d(q), obstacles, return_points=True,
+            max_distance=max_distance)
+        return distances[0], pairs[0], arm_points[0], obstacle_points[0]
+
+    def clearance_batch(self, Q, obstacles, return_points=False,
+                        max_distance=None):
+        """Signed clearance between the arm and a set of obstacles for
+        many joint configurations at once, without moving the arm
+
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :param obstacles: The obstacles to measure against
+        :type obstacles: maddux.objects.ObstacleSet or
+                         list of maddux.objects.Obstacle
+
+        :param return_points: (Default: False) Also return the closest
+                              (link, obstacle) index pair and point pair
+                              for each configuration
+        :type return_points: bool
+
+        :param max_distance: (Optional) Ignore obstacles further than this
+                             from the arm. Configurations with nothing in
+                             range get an infinite clearance.
+        :type max_distance: float or None
+
+        :returns: M signed distances, and if return_points is set Mx2
+                  index pairs, Mx3 points on the arm and Mx3 points on the
+                  obstacles
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray,
+                numpy.ndarray, numpy.ndarray)
+        """
+        if not isinstance(obstacles, ObstacleSet):
+            obstacles = ObstacleSet(obstacles)
+
+        starts, ends = self.link_segments_batch(Q)
+        M, N = starts.shape[0:2]
+        radius = np.tile([link.link_size for link in self.links], M)
+
+        d, nearest, on_arm, on_obstacle = obstacles.closest_to_capsules(
+            starts.reshape((-1, 3)), ends.reshape((-1, 3)), radius,
+            max_distance)
+        d = d.reshape((M, N))
+
+        distances = np.full(M, np.inf)
+        link = np.zeros(M, dtype=int)
+        if N:
+            link = np.argmin(d, axis=1)
+            distances = d[np.arange(M), link]
+        if not return_points:
+            return distances
+
+        pairs = np.full((M, 2), -1, dtype=int)
+        arm_points = np.full((M, 3), np.nan)
+        obstacle_points = np.full((M, 3), np.nan)
+        found = np.isfinite(distances)
+        rows = np.arange(M)[found] * N + link[found]
+
+        pairs[found, 0] = link[found]
+        pairs[found, 1] = nearest[rows]
+        arm_points[found] = on_arm[rows]
+        obstacle_points[found] = on_obstacle[rows]
+        return distances, pairs, arm_points, obstacle_points
+
+    def link_segments_batch(self, Q):
+        """Computes the start and end of every link for many joint
+        configurations, matching the base_pos and end_pos that
+        update_link_positions would set.
+
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :returns: MxNx3 link start points and MxNx3 link end points
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        _, frames = self.fkine_batch(Q, return_frames=True)
+        tool_pos = np.asarray(self.tool)[:, 3]
+        tips = np.dot(frames[:, :, 0:3], tool_pos)
+
+        starts = np.empty_like(tips)
+        ends = np.empty_like(tips)
+        start = np.broadcast_to(self.base[0:3, 3], (len(tips), 3))
+        for i, link in enumerate(self.links):
+            starts[:, i] = start
+            # Links without length or offset stay where they start
+            if link.length == 0 and link.offset == 0:
+                ends[:, i] = start
+            else:
+                ends[:, i] = tips[:, i]
+            start = ends[:, i]
+        return starts, ends
+
+    def in_collision_batch(self, Q, obstacles, return_pairs=False):
+        """Checks many joint configurations against a set of obstacles at
+        once, without moving the arm. Every link, obstacle and
+        configuration is tested in one array operation.
+
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :param obstacles: The obstacles to check against
+        :type obstacles: maddux.objects.ObstacleSet or
+                         list of maddux.objects.Obstacle
+
+        :param return_pairs: (Default: False) Also return the first
+                             colliding (link, obstacle) index pair for each
+                             configuration, or (-1, -1) if there is none
+        :type return_pairs: bool
+
+        :returns: M collision mask, and Mx2 index pairs if return_pairs
+                  is set
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        if not isinstance(obstacles, ObstacleSet):
+            obstacles = ObstacleSet(obstacles)
+
+        starts, ends = self.link_segments_batch(Q)
+        M = len(starts)
+        K = len(obstacles)
+
+        idx = np.zeros(0, dtype=int)
+        if K and self.num_links and M:
+            # Only test the boxes near anything the links sweep through
+            radius = np.array([link.link_size for link in self.links])
+            reach = radius.max()
+            idx = obstacles.candidates(
+                np.minimum(starts, ends).min(axis=(0, 1)) - reach,
+                np.maximum(starts, ends).max(axis=(0, 1)) + reach)
+
+        if idx.size:
+            hits = geometry.capsules_hit_boxes(
+                starts[:, :, np.newaxis], ends[:, :, np.newaxis],
+                radius[:, np.newaxis], obstacles.lo[idx], obstacles.hi[idx])
+        else:
+            hits = np.zeros((M, self.num_links, 0), dtype=bool)
+
+        hits = hits.reshape((M, -1))
+        collides = np.any(hits, axis=1)
+        if not return_pairs:
+            return collides
+
+        # Links are checked in order, then obstacles within each link
+        pairs = np.full((M, 2), -1, dtype=int)
+        if collides.any() and idx.size:
+            first = np.argmax(hits[collides], axis=1)
+            pairs[collides, 0] = first // len(idx)
+            pairs[collides, 1] = idx[first % len(idx)]
+        return collides, pairs
+
+    def build_self_collision_filter(self, num_samples=10000, margin=None,
+                                    rng=None):
+        """Decide once which link pairs can collide with each other.
+        Adjacent links are skipped, as are pairs that touch in every
+        sampled configuration (e.g. links joined through zero length
+        links) and pairs that never came within margin of each other.
+
+        :param num_samples: (Default: 10000) Joint configurations to sample
+        :type num_samples: int
+
+        :param margin: (Optional) Pairs whose closest sampled approach is
+                       further than this are never checked. Defaults to
+                       twice the largest link size.
+        :type margin: float or None
+
+        :param rng: (Optional) Random state to sample from
+        :type rng: numpy.random.RandomState or None
+
+        :returns: NxN mask, True for the (i, j) pairs with i < j to check
+        :rtype: numpy.ndarray
+        """
+        if margin is None:
+            margin = 2 * max([link.link_size for link in self.links] or [0])
+
+        i, j = np.triu_indices(self.num_links, 2)
+        Q = ik.sample_configurations(self, num_samples, rng)
+        d = self._self_distances(Q, i, j)
+
+        keep = ~np.all(d <= 0, axis=0) & (np.min(d, axis=0) <= margin)
+        self.self_collision_filter = np.zeros((self.num_links,
+                                               self.num_links), dtype=bool)
+        self.self_collision_filter[i[keep], j[keep]] = True
+        return self.self_collision_filter
+
+    def _self_distances(self, Q, i, j):
+        """MxP capsule distances between links i and j"""
+        starts, ends = self.link_segments_batch(Q)
+        radius = np.array([link.link_size for link in self.links])
+        return (geometry.segment_segment_distances(
+            starts[:, i], ends[:, i], starts[:, j], ends[:, j]) -
+            radius[i] - radius[j])
+
+    def in_self_collision(self):
+        """Checks if any two links of the arm in its current configuration
+        hit each other
+
+        :returns: Whether the arm hits itself
+        :rtype: bool
+        """
+        return bool(self.in_self_collision_batch(self.chain.q[np.newaxis])[0])
+
+    def in_self_collision_batch(self, Q, return_pairs=False):
+        """Checks many joint configurations for links hitting each other,
+        only testing the pairs in self_collision_filter
+
+        :param Q: MxN array of joint configurations
+        :type Q: numpy.ndarray
+
+        :param return_pairs: (Default: False) Also return the first
+                             colliding (link, link) index pair for each
+                             configuration, or (-1, -1) if there is none
+        :type return_pairs: bool
+
+        :returns: M collision mask, and Mx2 index pairs if return_pairs
+                  is set
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        if self.self_collision_filter is None:
+            self.build_self_collision_filter()
+
+        i, j = np.nonzero(self.self_collision_filter)
+        hits = self._self_distances(self._as_batch(Q), i, j) <= 0
+        collides = np.any(hits, axis=1)
+        if not return_pairs:
+            return collides
+
+        pairs = np.full((len(hits), 2), -1, dtype=int)
+        if collides.any() and len(i):
+            first = np.argmax(hits[collides], axis=1)
+            pairs[collides, 0] = i[first]
+            pairs[collides, 1] = j[first]
+        return collides, pairs
+
+    def in_collision_between(self, q0, q1, obstacles, tolerance=1e-3,
+                             max_iterations=1000, return_time=False):
+        """Checks the whole straight joint space motion from q0 to q1
+        against a set of obstacles, without moving the arm. Uses
+        conservative advancement: no point of the arm can move faster than
+        a bound set by the joint speeds and the reach past each joint, so
+        the motion can safely advance until that bound could have closed
+        the current clearance.
+
+        :param q0: Joint configuration the motion starts from
+        :type q0: numpy.ndarray
+
+        :param q1: Joint configuration the motion ends at
+        :type q1: numpy.ndarray
+
+        :param obstacles: The obstacles to check against
+        :type obstacles: maddux.objects.ObstacleSet or
+                         list of maddux.objects.Obstacle
+
+        :param tolerance: (Default: 1e-3) Clearance counted as contact
+        :type tolerance: float
+
+        :param max_iterations: (Default: 1000) Advancement steps allowed
+                               before giving up and reporting a collision
+        :type max_iterations: int
+
+        :param return_time: (Default: False) Also return the fraction of
+                            the motion at first contact, or None if the
+                            motion is free
+        :type return_time: bool
+
+        :returns: Whether the motion collides, and the time of first
+                  contact if return_time is set
+        :rtype: bool or (bool, float or None)
+        """
+        if (self.config_cache is not None and
+                isinstance(obstacles, ObstacleSet)):
+            token = ('motion', self.config_cache.key(q1), tolerance,
+                     max_iterations, obstacles, obstacles.version)
+            result = self.config_cache.lookup_collision(q0, token)
+            if result is None:
+                result = self._in_collision_between(q0, q1, obstacles,
+                                                    tolerance, max_iterations)
+                self.config_cache.insert_collision(q0, token, result)
+        else:
+            result = self._in_collision_between(q0, q1, obstacles,
+                                                tolerance, max_iterations)
+
+        if return_time:
+            return result
+        return result[0]
+
+    def _in_collision_between(self, q0, q1, obstacles, tolerance,
+                              max_iterations):
+        """in_collision_between without the cache, always returning the
+        time of first contact"""
+        if not isinstance(obstacles, ObstacleSet):
+            obstacles = ObstacleSet(obstacles)
+        q0 = np.asarray(q0, dtype=float)
+        dq = np.asarray(q1, dtype=float) - q0
+
+        # Joint i can swing everything after it by at most its reach
+        reach = np.abs(self.chain.offset) + np.abs(self.chain.length)
+        reach = np.cumsum(reach[::-1])[::-1]
+        reach += np.linalg.norm(np.asarray(self.tool)[0:3, 3])
+        reach += max([link.link_size for link in self.links] or [0])
+        speed = np.dot(np.abs(dq), reach)
+
+        # Only obstacles the arm could reach during the motion matter. The
+        # region usually spans many grid cells, so the boxes are tested
+        # against it directly.
+        starts, ends = self.link_segments_batch(q0[np.newaxis])
+        radius = np.array([link.link_size for link in self.links])
+        reach = (radius.max() if radius.size else 0.0) + speed
+        near = np.all(
+            (obstacles.lo <= np.maximum(starts, ends).max(axis=(0, 1)) +
+             reach) &
+            (obstacles.hi >= np.minimum(starts, ends).min(axis=(0, 1)) -
+             reach), axis=1)
+        lo = obstacles.lo[near]
+        hi = obstacles.hi[near]
+
+        t = 0.0
+        hit = None
+        for _ in xrange(max_iterations):
+            # Only the gap matters here, not the closest points or how
+            # deep an overlap goes, since any overlap is a contact
+            clearance = np.inf
+            if len(lo) and radius.size:
+                starts, ends = self.link_segments_batch(
+                    (q0 + t * dq)[np.newaxis])
+                clearance = np.min(geometry.segment_box_distances(
+                    starts[0, :, np.newaxis], ends[0, :, np.newaxis],
+                    lo, hi) - radius[:, np.newaxis])
+            if clearance <= tolerance:
+                hit = t
+                break
+            if t >= 1.0 or speed == 0:
+                break
+            t = min(t + clearance / speed, 1.0)
+        else:
+            hit = t
+
+        return hit is not None, hit
 
     def plot(self, ax):
         """Plot our robot into given axes
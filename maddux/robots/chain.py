@@ -0,0 +1,151 @@
+"""
+A compiled, array based view of an arm's DH links used for fast
+forward kinematics and jacobians.
+"""
+import math
+import numpy as np
+
+
+class KinematicChain:
+
+    def __init__(self, links):
+        """Compile a sequence of links into contiguous parameter arrays.
+
+        Each link is bound to the chain, so setting a link's theta updates
+        the chain's joint vector and that link's slot in the transform
+        buffer in place.
+
+        :param links: 1xN Vector of Link objects
+        :type links: numpy.ndarray
+
+        :rtype: None
+        """
+        self.num_links = len(links)
+
+        # Current joint angles and the Nx4x4 buffer of link transforms
+        self.q = np.zeros(self.num_links)
+        self.transforms = np.zeros((self.num_links, 4, 4))
+        self.transforms[:, 3, 3] = 1.0
+
+        for i, link in enumerate(links):
+            link.bind(self, i)
+        self.refresh(links)
+
+    def refresh(self, links):
+        """Re-read the DH parameters of the links, e.g. after a link's
+        offset, length or twist was changed by hand
+
+        :param links: 1xN Vector of the Link objects the chain was built from
+        :type links: numpy.ndarray
+
+        :rtype: None
+        """
+        self.offset = np.array([link.offset for link in links], dtype=float)
+        self.length = np.array([link.length for link in links], dtype=float)
+        self.twist = np.array([link.twist for link in links], dtype=float)
+
+        # Twist only changes here, so we only ever need its sin and cos once
+        self.sin_twist = np.sin(self.twist)
+        self.cos_twist = np.cos(self.twist)
+
+        self.transforms[:, 2, 1] = self.sin_twist
+        self.transforms[:, 2, 2] = self.cos_twist
+        self.transforms[:, 2, 3] = self.offset
+        for i, link in enumerate(links):
+            self.set_theta(i, link.theta)
+
+    def set_theta(self, i, theta):
+        """Set a single joint angle and update its transform in place
+
+        :param i: Index of the link
+        :type i: int
+
+        :param theta: The new joint angle
+        :type theta: float
+
+        :rtype: None
+        """
+        self.q[i] = theta
+        self._fill_transform(self.transforms[i], i, theta)
+
+    def link_transform(self, i, theta):
+        """Compute a single link's transform for a given joint angle
+        without touching the chain's own state.
+
+        :param i: Index of the link
+        :type i: int
+
+        :param theta: The joint angle
+        :type theta: float
+
+        :returns: 4x4 link transform
+        :rtype: numpy.ndarray
+        """
+        T = self.transforms[i].copy()
+        self._fill_transform(T, i, theta)
+        return T
+
+    def _fill_transform(self, T, i, theta):
+        """Write the joint dependent entries of link i's transform into T"""
+        st = math.sin(theta)
+        ct = math.cos(theta)
+        sa = self.sin_twist[i]
+        ca = self.cos_twist[i]
+
+        T[0, 0] = ct
+        T[0, 1] = -st * ca
+        T[0, 2] = st * sa
+        T[0, 3] = self.length[i] * ct
+        T[1, 0] = st
+        T[1, 1] = ct * ca
+        T[1, 2] = -ct * sa
+        T[1, 3] = self.length[i] * st
+
+    def link_transforms(self, Q):
+        """Compute the link transforms for one or many joint configurations
+        without touching the chain's own state.
+
+        :param Q: 1xN joint configuration or MxN joint configurations
+        :type Q: numpy.ndarray
+
+        :returns: Q.shape + (4, 4) stack of link transforms
+        :rtype: numpy.ndarray
+        """
+        Q = np.asarray(Q, dtype=float)
+        st = np.sin(Q)
+        ct = np.cos(Q)
+
+        T = np.zeros(Q.shape + (4, 4))
+        T[..., 0, 0] = ct
+        T[..., 0, 1] = -st * self.cos_twist
+        T[..., 0, 2] = st * self.sin_twist
+        T[..., 0, 3] = self.length * ct
+        T[..., 1, 0] = st
+        T[..., 1, 1] = ct * self.cos_twist
+        T[..., 1, 2] = -ct * self.sin_twist
+        T[..., 1, 3] = self.length * st
+        T[..., 2, 1] = self.sin_twist
+        T[..., 2, 2] = self.cos_twist
+        T[..., 2, 3] = self.offset
+        T[..., 3, 3] = 1.0
+        return T
+
+    def frames(self, A, base):
+        """Chain link transforms together into world frames
+
+        :param A: MxNx4x4 stack of link transforms
+        :type A: numpy.ndarray
+
+        :param base: 4x4 base transform of the arm
+        :type base: numpy.ndarray
+
+        :returns: MxNx4x4 world frame at the end of each link
+        :rtype: numpy.ndarray
+        """
+        frames = np.empty_like(A)
+        t = np.broadcast_to(np.asarray(base, dtype=float),
+                            (A.shape[0], 4, 4))
+        for i in range(self.num_links):
+            t = np.matmul(t, A[:, i])
+            frames[:, i] = t
+        return frames
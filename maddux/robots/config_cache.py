@@ -0,0 +1,168 @@
+"""
+A cache of forward kinematics and collision results for previously
+visited joint configurations.
+"""
+from collections import OrderedDict
+import numpy as np
+
+
+class ConfigurationCache:
+
+    def __init__(self, capacity=4096, resolution=1e-6):
+        """An LRU cache keyed on joint configurations quantized to a
+        lattice, so configurations reached by different sequences of
+        steps (and differing only by rounding) share an entry.
+
+        :param capacity: (Default: 4096) Maximum number of configurations
+        :type capacity: int
+
+        :param resolution: (Default: 1e-6) Joint angle quantization step.
+                           Configurations within the same step are treated
+                           as the same.
+        :type resolution: float
+
+        :rtype: None
+        """
+        self.capacity = capacity
+        self.resolution = resolution
+
+        # Configuration key -> {'frames': ..., 'collisions': {...}}, least
+        # recently used first
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.collision_hits = 0
+        self.collision_misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, q):
+        """The lattice point a configuration is stored under
+
+        :param q: Joint configuration
+        :type q: numpy.ndarray
+
+        :rtype: tuple
+        """
+        return tuple(np.round(np.asarray(q) / self.resolution).astype(int))
+
+    def hit_ratio(self):
+        """Fraction of forward kinematics lookups that were hits
+
+        :rtype: float
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def collision_hit_ratio(self):
+        """Fraction of collision lookups that were hits
+
+        :rtype: float
+        """
+        lookups = self.collision_hits + self.collision_misses
+        return float(self.collision_hits) / lookups if lookups else 0.0
+
+    def lookup(self, q):
+        """Find the stored link positions for a configuration
+
+        :param q: Joint configuration
+        :type q: numpy.ndarray
+
+        :returns: The Nx4x4 link frames, Nx3 link base positions and Nx3
+                  link end positions, or None on a miss
+        :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray) or None
+        """
+        entry = self._touch(self.key(q))
+        if entry is None or entry['frames'] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['frames']
+
+    def insert(self, q, frames, base_positions, end_positions):
+        """Store the link positions computed for a configuration
+
+        :param q: Joint configuration
+        :type q: numpy.ndarray
+
+        :param frames: Nx4x4 link frames
+        :type frames: numpy.ndarray
+
+        :param base_positions: Nx3 link base positions
+        :type base_positions: numpy.ndarray
+
+        :param end_positions: Nx3 link end positions
+        :type end_positions: numpy.ndarray
+
+        :rtype: None
+        """
+        entry = self._entry(self.key(q))
+        entry['frames'] = (frames.copy(), base_positions.copy(),
+                           end_positions.copy())
+
+    def lookup_collision(self, q, token):
+        """Find a stored collision result
+
+        :param q: Joint configuration
+        :type q: numpy.ndarray
+
+        :param token: Hashable description of what was checked
+        :type token: hashable
+
+        :returns: The stored result, or None on a miss
+        :rtype: bool or None
+        """
+        entry = self._touch(self.key(q))
+        result = None if entry is None else entry['collisions'].get(token)
+        if result is None:
+            self.collision_misses += 1
+        else:
+            self.collision_hits += 1
+        return result
+
+    def insert_collision(self, q, token, result):
+        """Store a collision result
+
+        :param q: Joint configuration
+        :type q: numpy.ndarray
+
+        :param token: Hashable description of what was checked
+        :type token: hashable
+
+        :param result: Whether there was a collision
+        :type result: bool
+
+        :rtype: None
+        """
+        self._entry(self.key(q))['collisions'][token] = result
+
+    def clear(self):
+        """Drop every entry and reset the hit and miss counters
+
+        :rtype: None
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.collision_hits = 0
+        self.collision_misses = 0
+
+    def _touch(self, key):
+        """Mark an entry as most recently used and return it, or None"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.entries[key] = entry
+        return entry
+
+    def _entry(self, key):
+        """Get or create the entry for a key, evicting the least recently
+        used entries once the cache is full"""
+        entry = self._touch(key)
+        if entry is None:
+            entry = {'frames': None, 'collisions': {}}
+            self.entries[key] = entry
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return entry
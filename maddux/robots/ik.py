@@ -0,0 +1,143 @@
+"""
+Helpers shared by the arm's inverse kinematics solvers.
+"""
+import numpy as np
+
+# Solvers understood by Arm.ikine
+SOLVERS = ('pinv', 'lm', 'analytic')
+
+# Bounds on the Levenberg-Marquardt damping factor
+MIN_DAMPING = 1e-9
+MAX_DAMPING = 1e9
+
+# End effector position error at which we consider a target reached
+POSITION_TOLERANCE = 1e-6
+
+
+def sample_configurations(arm, num_samples, rng=None):
+    """Sample random joint configurations, uniformly within each link's
+    q_lim where it is set and within [-pi, pi] otherwise
+
+    :param arm: The arm to sample configurations for
+    :type arm: maddux.robots.Arm
+
+    :param num_samples: Number of configurations to sample
+    :type num_samples: int
+
+    :param rng: (Optional) Random state to sample from
+    :type rng: numpy.random.RandomState or None
+
+    :returns: num_samples x N joint configurations
+    :rtype: numpy.ndarray
+    """
+    if rng is None:
+        rng = np.random
+
+    low = np.full(arm.num_links, -np.pi)
+    high = np.full(arm.num_links, np.pi)
+    for i, link in enumerate(arm.links):
+        if link.q_lim is not None:
+            low[i], high[i] = link.q_lim
+
+    return rng.uniform(low, high, (num_samples, arm.num_links))
+
+
+def dls_step(J, err, damping):
+    """Damped least squares joint step for a batch of position errors,
+    i.e. dq = J^T (J J^T + damping I)^-1 err
+
+    :param J: MxKxN stack of (position) jacobians
+    :type J: numpy.ndarray
+
+    :param err: MxK stack of errors to correct
+    :type err: numpy.ndarray
+
+    :param damping: M damping factors, one per row
+    :type damping: numpy.ndarray
+
+    :returns: MxN joint steps
+    :rtype: numpy.ndarray
+    """
+    Jt = J.transpose(0, 2, 1)
+    JJt = np.matmul(J, Jt)
+    JJt += damping[:, np.newaxis, np.newaxis] * np.identity(J.shape[1])
+    y = np.linalg.solve(JJt, err[:, :, np.newaxis])
+    return np.matmul(Jt, y)[:, :, 0]
+
+
+def lm_batch(arm, P, Q0, num_iterations=1000, damping=1e-2, rel_tol=1e-9,
+             stop_on_first=False):
+    """Levenberg-Marquardt inverse kinematics for many targets in lock-step.
+    Every row keeps its own damping, and rows that converge or stall are
+    masked out of the remaining iterations. The arm's state is not touched.
+
+    :param arm: The arm to solve for
+    :type arm: maddux.robots.Arm
+
+    :param P: Mx3 array of target points
+    :type P: numpy.ndarray
+
+    :param Q0: MxN array of seed joint configurations
+    :type Q0: numpy.ndarray
+
+    :param num_iterations: Maximum number of iterations per row
+    :type num_iterations: int
+
+    :param damping: Initial damping factor
+    :type damping: float
+
+    :param rel_tol: A row stops once a step improves its error by less
+                    than this fraction
+    :type rel_tol: float
+
+    :param stop_on_first: (Default: False) Stop every row as soon as any
+                          row converges
+    :type stop_on_first: bool
+
+    :returns: MxN solutions, M converged mask and M iteration counts
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    Q = np.array(Q0, dtype=float)
+    J, T = arm.jacob0_batch(Q, return_fkine=True)
+    err = P - T[:, 0:3, 3]
+    norm = np.sqrt(np.sum(err ** 2, axis=1))
+
+    lam = np.full(len(Q), damping, dtype=float)
+    iterations = np.zeros(len(Q), dtype=int)
+    active = norm > POSITION_TOLERANCE
+    if stop_on_first and not np.all(active):
+        # A seed is already at its target
+        active[:] = False
+
+    for _ in xrange(num_iterations):
+        rows = np.flatnonzero(active)
+        if not rows.size:
+            break
+        iterations[rows] += 1
+
+        Q_new = Q[rows] + dls_step(J[rows, 0:3], err[rows], lam[rows])
+        J_new, T_new = arm.jacob0_batch(Q_new, return_fkine=True)
+        err_new = P[rows] - T_new[:, 0:3, 3]
+        norm_new = np.sqrt(np.sum(err_new ** 2, axis=1))
+
+        better = norm_new < norm[rows]
+        accepted = rows[better]
+        rejected = rows[~better]
+        improvement = (norm[accepted] - norm_new[better]) / norm[accepted]
+
+        Q[accepted] = Q_new[better]
+        J[accepted] = J_new[better]
+        err[accepted] = err_new[better]
+        norm[accepted] = norm_new[better]
+        lam[accepted] = np.maximum(lam[accepted] / 10.0, MIN_DAMPING)
+        lam[rejected] *= 10.0
+
+        # Retire rows that reached their target, stalled, or gave up
+        active[accepted] = ((norm[accepted] > POSITION_TOLERANCE) &
+                            (improvement >= rel_tol))
+        active[rejected] = lam[rejected] <= MAX_DAMPING
+
+        if stop_on_first and np.any(norm[accepted] <= POSITION_TOLERANCE):
+            break
+
+    return Q, norm <= POSITION_TOLERANCE, iterations
@@ -0,0 +1,145 @@
+"""
+A cache of previously solved inverse kinematics targets used to answer
+repeated queries and to warm start the solver on nearby ones.
+"""
+from collections import OrderedDict
+import numpy as np
+
+
+class IKCache:
+
+    def __init__(self, capacity=1024, tolerance=1e-6, cell_size=0.25):
+        """An LRU cache of (target, solution) pairs indexed by a uniform
+        grid over target space.
+
+        :param capacity: (Default: 1024) Maximum number of stored solutions
+        :type capacity: int
+
+        :param tolerance: (Default: 1e-6) Distance within which a stored
+                          target counts as an exact hit
+        :type tolerance: float
+
+        :param cell_size: (Default: 0.25) Edge length of the grid cells
+                          used to find nearby targets
+        :type cell_size: float
+
+        :rtype: None
+        """
+        self.capacity = capacity
+        self.tolerance = tolerance
+        self.cell_size = cell_size
+
+        # Entry id -> (target, solution), least recently used first
+        self.entries = OrderedDict()
+        # Grid cell -> set of entry ids inside it
+        self.grid = {}
+        self.next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def hit_ratio(self):
+        """Fraction of lookups that were exact hits
+
+        :rtype: float
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def lookup(self, p):
+        """Find the stored solution whose target is nearest to p
+
+        :param p: The point (x, y, z) being solved for
+        :type p: numpy.ndarray
+
+        :returns: The nearest stored solution (or None if the cache is
+                  empty) and whether it is an exact hit
+        :rtype: (numpy.ndarray or None, bool)
+        """
+        p = np.asarray(p, dtype=float)
+        key, distance = self._nearest(p)
+
+        if key is not None and distance <= self.tolerance:
+            self.hits += 1
+            # Move the entry to the most recently used end
+            entry = self.entries.pop(key)
+            self.entries[key] = entry
+            return entry[1].copy(), True
+
+        self.misses += 1
+        if key is None:
+            return None, False
+        return self.entries[key][1].copy(), False
+
+    def insert(self, p, q):
+        """Store a solved target, evicting the least recently used entries
+        once the cache is full
+
+        :param p: The solved point (x, y, z)
+        :type p: numpy.ndarray
+
+        :param q: The joint configuration reaching p
+        :type q: numpy.ndarray
+
+        :rtype: None
+        """
+        p = np.array(p, dtype=float)
+        key, distance = self._nearest(p)
+        if key is not None and distance <= self.tolerance:
+            self._remove(key)
+
+        key = self.next_id
+        self.next_id += 1
+        self.entries[key] = (p, np.array(q, dtype=float))
+        self.grid.setdefault(self._cell(p), set()).add(key)
+
+        while len(self.entries) > self.capacity:
+            self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        """Drop every entry and reset the hit and miss counters
+
+        :rtype: None
+        """
+        self.entries.clear()
+        self.grid.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _cell(self, p):
+        """Grid cell containing point p"""
+        return tuple(np.floor(p / self.cell_size).astype(int))
+
+    def _remove(self, key):
+        """Remove an entry from both the LRU order and the grid"""
+        target, _ = self.entries.pop(key)
+        cell = self._cell(target)
+        self.grid[cell].discard(key)
+        if not self.grid[cell]:
+            del self.grid[cell]
+
+    def _nearest(self, p):
+        """Id of and distance to the nearest stored target. Only the
+        surrounding 3x3x3 block of cells is searched unless it is empty,
+        so the result is approximate beyond one cell.
+        """
+        if not self.entries:
+            return None, np.inf
+
+        cx, cy, cz = self._cell(p)
+        keys = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    keys.extend(self.grid.get((cx + dx, cy + dy, cz + dz),
+                                              ()))
+        if not keys:
+            keys = list(self.entries)
+
+        targets = np.array([self.entries[key][0] for key in keys])
+        distances = np.sqrt(np.sum((targets - p) ** 2, axis=1))
+        i = np.argmin(distances)
+        return keys[i], distances[i]
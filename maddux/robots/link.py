@@ -4,6 +4,7 @@ the DH parameters and position in relation to the world.
 """
 import numpy as np
 from maddux.plot import plot_sphere
+from maddux.integrators import SemiImplicitEuler, constant
 import math
 
 
@@ -46,6 +47,10 @@ class Link:
         self.twist = twist
         self.q_lim = q_lim
 
+        # The kinematic chain (and our index in it) once we join an arm
+        self.chain = None
+        self.chain_index = None
+
         self.max_velocity = max_velocity
         self.link_size = link_size
         self.connector_size = connector_size
@@ -53,13 +58,30 @@ class Link:
         self.set_theta(theta)
         self.velocity = 0  # Link's current velocity
 
+        # How update_velocity moves the link
+        self.integrator = SemiImplicitEuler()
+
         # This is updated once we add it to an arm
         self.base_pos = None
         self.end_pos = None
 
+    def bind(self, chain, index):
+        """Bind the link to a slot of an arm's kinematic chain so that
+        angle updates are written straight into the chain's arrays
+
+        :param chain: The chain this link belongs to
+        :type chain: maddux.robots.chain.KinematicChain
+
+        :param index: Index of this link in the chain
+        :type index: int
+
+        :rtype: None
+        """
+        self.chain = chain
+        self.chain_index = index
+
     def set_theta(self, theta):
-        """Sets theta to the new theta and computes the new
-        transformation matrix
+        """Sets theta to the new theta and updates the link's transform
 
         :param theta: The new theta for the link
         :type theta: int
@@ -67,7 +89,18 @@ class Link:
         :rtype: None
         """
         self.theta = theta
-        self.transform_matrix = self.compute_transformation_matrix(theta)
+        if self.chain is not None:
+            self.chain.set_theta(self.chain_index, theta)
+
+    @property
+    def transform_matrix(self):
+        """Transformation matrix for the link's current theta
+
+        :rtype: 4x4 numpy matrix
+        """
+        if self.chain is not None:
+            return np.asmatrix(self.chain.transforms[self.chain_index])
+        return self.compute_transformation_matrix(self.theta)
 
     def update_velocity(self, accel, time):
         """Updates the current velocity of the link when acted upon
@@ -82,10 +115,10 @@ class Link:
 
         :rtype: None
         """
-        new_velocity = self.velocity + (accel * time)
+        new_theta, new_velocity = self.integrator.step(
+            constant(accel), self.theta, self.velocity, time)
         if new_velocity <= self.max_velocity:
             self.velocity = new_velocity
-            new_theta = self.theta + (new_velocity * time)
             new_theta = math.atan2(math.sin(new_theta),
                                    math.cos(new_theta))
             self.set_theta(new_theta)
@@ -99,8 +132,8 @@ class Link:
         :returns: Transformation matrix from current q to provided q
         :rtype: 4x4 numpy matrix
         """
-        sa = np.sin(self.twist)
-        ca = np.cos(self.twist)
+        sa = math.sin(self.twist)
+        ca = math.cos(self.twist)
         st = np.sin(q)
         ct = np.cos(q)
         T = np.matrix([[ct, -st * ca, st * sa, self.length * ct],
@@ -111,7 +144,9 @@ class Link:
 
     # TODO: Abstract this to take dynamic objects as well as static ones
     def is_in_collision(self, env_object):
-        """Checks if the arm is in collision with a given static object
+        """Checks if the arm is in collision with a given static object.
+        The link is treated as a capsule of radius link_size around the
+        segment from its base to its end.
 
         :param env_object: The object to check for collisions with
         :type env_object: maddux.objects.StaticObject
@@ -119,26 +154,21 @@ class Link:
         :returns: Whether link hits the provided env_object
         :rtype: bool
         """
-        intersects_joint = env_object.is_hit_by_sphere(self.base_pos,
-                                                       self.link_size)
-        # If the link sphere is in collision we do not need to
-        # check anything else
-        if intersects_joint:
-            return True
-
-        # If the link is just a joint we only needed to check sphere,
-        # and since we would have already returned, we know we're safe
-        if self.length == 0 and self.offset == 0:
-            return False
+        return env_object.is_hit_by_capsule(self.base_pos, self.end_pos,
+                                            self.link_size)
 
-        # Otherwise we need to check if the object intersects with
-        # the arm connector, so we vectorize it and call is_hit
-        lamb = np.linspace(0, 1, 100)
-        v = self.end_pos - self.base_pos
+    def distance_to(self, env_object):
+        """Signed distance from the link to an object, negative by the
+        depth they overlap if the link hits it
 
-        positions = self.base_pos + lamb[:, np.newaxis] * v
+        :param env_object: The object to measure the distance to
+        :type env_object: maddux.objects.Obstacle or
+                          maddux.objects.ObstacleSet
 
-        return env_object.is_hit(positions)
+        :rtype: float
+        """
+        return env_object.distance_to_capsule(self.base_pos, self.end_pos,
+                                              self.link_size)
 
     def display(self):
         """Display the link's properties nicely
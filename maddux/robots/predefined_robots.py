@@ -1,5 +1,6 @@
 from link import Link
 from arm import Arm
+from analytic import SimpleHumanArmIK
 import numpy as np
 
 
@@ -32,6 +33,7 @@ def simple_human_arm(seg1_len, seg2_len, q0, base=None):
     links = np.array([L1, L2, L3, L4, L5, L6, L7])
 
     robot = Arm(links, q0, 'simple_human_arm', 4, base)
+    robot.analytic_solver = SimpleHumanArmIK(seg1_len, seg2_len)
     return robot
 
 
@@ -0,0 +1,191 @@
+"""
+A voxel map of the positions an arm's end effector can reach, used to
+reject unreachable targets without running the inverse kinematics.
+"""
+import hashlib
+import os
+import numpy as np
+import ik
+
+
+def arm_key(arm):
+    """A hash of everything that determines an arm's workspace: its DH
+    parameters, joint limits, base and tool.
+
+    :param arm: The arm to hash
+    :type arm: maddux.robots.Arm
+
+    :returns: Hex digest identifying the arm's workspace
+    :rtype: str
+    """
+    low = np.array([link.q_lim[0] if link.q_lim is not None else -np.pi
+                    for link in arm.links], dtype=float)
+    high = np.array([link.q_lim[1] if link.q_lim is not None else np.pi
+                     for link in arm.links], dtype=float)
+    params = np.concatenate((arm.chain.offset, arm.chain.length,
+                             arm.chain.twist, low, high,
+                             np.ravel(arm.base), np.ravel(arm.tool)))
+    return hashlib.sha1(np.round(params, 9).tobytes()).hexdigest()
+
+
+class ReachabilityMap:
+
+    def __init__(self, occupancy, origin, voxel_size, key):
+        """A boolean voxel grid of reachable end effector positions
+
+        :param occupancy: XxYxZ grid, True where a voxel is reachable
+        :type occupancy: numpy.ndarray
+
+        :param origin: World position (x, y, z) of the grid's first corner
+        :type origin: numpy.ndarray
+
+        :param voxel_size: Edge length of a voxel
+        :type voxel_size: float
+
+        :param key: The arm_key of the arm this map was built for
+        :type key: str
+
+        :rtype: None
+        """
+        self.occupancy = occupancy
+        self.origin = np.asarray(origin, dtype=float)
+        self.voxel_size = float(voxel_size)
+        self.key = key
+
+    @classmethod
+    def build(cls, arm, voxel_size=0.1, num_samples=200000, dilation=1,
+              batch_size=10000, rng=None):
+        """Build a map by sampling joint space with batched forward
+        kinematics and voxelizing the end effector positions
+
+        :param arm: The arm to build the map for
+        :type arm: maddux.robots.Arm
+
+        :param voxel_size: (Default: 0.1) Edge length of a voxel
+        :type voxel_size: float
+
+        :param num_samples: (Default: 200000) Joint configurations to sample
+        :type num_samples: int
+
+        :param dilation: (Default: 1) Voxels to grow the reachable region
+                         by, to cover gaps between samples
+        :type dilation: int
+
+        :param batch_size: (Default: 10000) Configurations per fkine_batch
+        :type batch_size: int
+
+        :param rng: (Optional) Random state to sample from
+        :type rng: numpy.random.RandomState or None
+
+        :returns: The reachability map
+        :rtype: maddux.robots.reachability.ReachabilityMap
+        """
+        positions = []
+        for start in xrange(0, num_samples, batch_size):
+            count = min(batch_size, num_samples - start)
+            Q = ik.sample_configurations(arm, count, rng)
+            positions.append(arm.fkine_batch(Q)[:, 0:3, 3])
+        positions = np.vstack(positions)
+
+        origin = positions.min(axis=0) - (dilation + 1) * voxel_size
+        extent = positions.max(axis=0) + (dilation + 1) * voxel_size - origin
+        shape = np.ceil(extent / voxel_size).astype(int) + 1
+
+        occupancy = np.zeros(shape, dtype=bool)
+        idx = np.floor((positions - origin) / voxel_size).astype(int)
+        occupancy[idx[:, 0], idx[:, 1], idx[:, 2]] = True
+
+        for _ in xrange(dilation):
+            occupancy = _dilate(occupancy)
+
+        return cls(occupancy, origin, voxel_size, arm_key(arm))
+
+    @classmethod
+    def load(cls, path):
+        """Load a map saved with save
+
+        :param path: Path of the .npz file
+        :type path: str
+
+        :returns: The reachability map
+        :rtype: maddux.robots.reachability.ReachabilityMap
+        """
+        with np.load(path) as data:
+            return cls(data['occupancy'], data['origin'],
+                       data['voxel_size'], str(data['key']))
+
+    @classmethod
+    def for_arm(cls, arm, directory, **kwargs):
+        """Load the map for an arm from a directory, building and saving
+        it first if no map with the arm's key exists there yet
+
+        :param arm: The arm to get the map for
+        :type arm: maddux.robots.Arm
+
+        :param directory: Directory holding saved maps
+        :type directory: str
+
+        :param kwargs: Passed on to build if a new map is needed
+
+        :returns: The reachability map
+        :rtype: maddux.robots.reachability.ReachabilityMap
+        """
+        path = os.path.join(directory,
+                            'reachability_{}.npz'.format(arm_key(arm)))
+        if os.path.exists(path):
+            return cls.load(path)
+
+        reach = cls.build(arm, **kwargs)
+        reach.save(path)
+        return reach
+
+    def save(self, path):
+        """Save the map to a .npz file
+
+        :param path: Path to save to
+        :type path: str
+
+        :rtype: None
+        """
+        np.savez(path, occupancy=self.occupancy, origin=self.origin,
+                 voxel_size=self.voxel_size, key=self.key)
+
+    def is_reachable(self, p):
+        """Whether a point lies in a reachable voxel
+
+        :param p: The point (x, y, z)
+        :type p: numpy.ndarray
+
+        :rtype: bool
+        """
+        return bool(self.are_reachable(np.atleast_2d(p))[0])
+
+    def are_reachable(self, P):
+        """Whether each of many points lies in a reachable voxel
+
+        :param P: Mx3 array of points
+        :type P: numpy.ndarray
+
+        :returns: M boolean mask
+        :rtype: numpy.ndarray
+        """
+        P = np.asarray(P, dtype=float)
+        idx = np.floor((P - self.origin) / self.voxel_size).astype(int)
+        inside = np.all((idx >= 0) & (idx < self.occupancy.shape), axis=1)
+
+        reachable = np.zeros(len(P), dtype=bool)
+        i = idx[inside]
+        reachable[inside] = self.occupancy[i[:, 0], i[:, 1], i[:, 2]]
+        return reachable
+
+
+def _dilate(occupancy):
+    """Grow a boolean voxel grid by one voxel in every direction"""
+    X, Y, Z = occupancy.shape
+    padded = np.pad(occupancy, 1, mode='constant')
+    grown = np.zeros_like(occupancy)
+    for dx in range(3):
+        for dy in range(3):
+            for dz in range(3):
+                grown |= padded[dx:dx + X, dy:dy + Y, dz:dz + Z]
+    return grown
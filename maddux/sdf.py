@@ -0,0 +1,221 @@
+"""
+A signed distance field of an environment's static scene, sampled on a
+voxel grid and stored as a .npy file that can be memory-mapped.
+"""
+import json
+import os
+import numpy as np
+
+
+class SignedDistanceField:
+
+    def __init__(self, distances, origin, voxel_size):
+        """Signed distances to the nearest wall or static object, sampled
+        at the corners of a voxel grid. Distances are positive in free
+        space and negative inside objects or beyond the walls.
+
+        :param distances: XxYxZ distances at the grid points
+        :type distances: numpy.ndarray or numpy.memmap
+
+        :param origin: World position (x, y, z) of the first grid point
+        :type origin: numpy.ndarray
+
+        :param voxel_size: Spacing between grid points
+        :type voxel_size: float
+
+        :rtype: None
+        """
+        self.distances = distances
+        self.origin = np.asarray(origin, dtype=float)
+        self.voxel_size = float(voxel_size)
+        self.shape = np.array(distances.shape)
+
+    @classmethod
+    def build(cls, env, voxel_size=0.1, padding=None, static_objects=None,
+              path=None, dtype=np.float32):
+        """Rasterize an environment's walls and static objects
+
+        :param env: The environment to build the field for
+        :type env: maddux.Environment
+
+        :param voxel_size: (Default: 0.1) Spacing between grid points
+        :type voxel_size: float
+
+        :param padding: (Optional) How far the grid extends past the
+                        walls. Defaults to two voxels.
+        :type padding: float or None
+
+        :param static_objects: (Optional) The objects to rasterize.
+                               Defaults to all of env.static_objects.
+                               Objects without signed_distances are
+                               sampled with are_hit instead.
+        :type static_objects: list of maddux.objects.StaticObject or None
+
+        :param path: (Optional) .npy file to rasterize straight into, so
+                     the grid never has to fit in memory
+        :type path: str or None
+
+        :param dtype: (Default: numpy.float32) Type to store distances as
+        :type dtype: numpy.dtype
+
+        :returns: The signed distance field
+        :rtype: maddux.sdf.SignedDistanceField
+        """
+        if padding is None:
+            padding = 2 * voxel_size
+        if static_objects is None:
+            static_objects = env.static_objects
+
+        dimensions = np.asarray(env.dimensions, dtype=float)
+        origin = -padding * np.ones(3)
+        shape = tuple(np.ceil((dimensions + 2 * padding) /
+                              voxel_size).astype(int) + 1)
+
+        if path is None:
+            distances = np.empty(shape, dtype=dtype)
+        else:
+            distances = np.lib.format.open_memmap(path, mode='w+',
+                                                  dtype=dtype, shape=shape)
+
+        ys = origin[1] + voxel_size * np.arange(shape[1])
+        zs = origin[2] + voxel_size * np.arange(shape[2])
+        Y, Z = np.meshgrid(ys, zs, indexing='ij')
+
+        # One slab of constant x at a time keeps the working set small
+        for i in xrange(shape[0]):
+            points = np.empty(Y.shape + (3,))
+            points[..., 0] = origin[0] + voxel_size * i
+            points[..., 1] = Y
+            points[..., 2] = Z
+            points = points.reshape((-1, 3))
+
+            slab = _wall_distances(points, dimensions)
+            for static in static_objects:
+                try:
+                    slab = np.minimum(slab, static.signed_distances(points))
+                except NotImplementedError:
+                    # Only which points lie inside the object is known, so
+                    # those are put on its surface
+                    slab = np.where(static.are_hit(points),
+                                    np.minimum(slab, 0.0), slab)
+            distances[i] = slab.reshape(Y.shape)
+
+        sdf = cls(distances, origin, voxel_size)
+        if path is not None:
+            distances.flush()
+            sdf._save_metadata(path)
+        return sdf
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a field saved with save
+
+        :param path: Path of the .npy file
+        :type path: str
+
+        :param mmap: (Default: True) Memory-map the grid read only rather
+                     than reading it, so processes share one copy
+        :type mmap: bool
+
+        :returns: The signed distance field
+        :rtype: maddux.sdf.SignedDistanceField
+        """
+        distances = np.load(path, mmap_mode='r' if mmap else None)
+        with open(_metadata_path(path)) as f:
+            metadata = json.load(f)
+        return cls(distances, metadata['origin'], metadata['voxel_size'])
+
+    def save(self, path):
+        """Save the grid to a .npy file, with the origin and voxel size
+        alongside it in a .json file of the same name
+
+        :param path: Path of the .npy file
+        :type path: str
+
+        :rtype: None
+        """
+        np.save(path, self.distances)
+        self._save_metadata(path)
+
+    def _save_metadata(self, path):
+        """Write the .json file describing the grid saved at path"""
+        with open(_metadata_path(path), 'w') as f:
+            json.dump({'origin': self.origin.tolist(),
+                       'voxel_size': self.voxel_size}, f)
+
+    def distance(self, p):
+        """Interpolated signed distance at a point
+
+        :param p: The point (x, y, z)
+        :type p: numpy.ndarray
+
+        :rtype: float
+        """
+        return float(self.query(np.atleast_2d(p))[0])
+
+    def gradient(self, p):
+        """Gradient of the interpolated signed distance at a point
+
+        :param p: The point (x, y, z)
+        :type p: numpy.ndarray
+
+        :rtype: numpy.ndarray
+        """
+        return self.query(np.atleast_2d(p), return_gradients=True)[1][0]
+
+    def query(self, points, return_gradients=False):
+        """Trilinearly interpolated signed distance at many points. Points
+        outside the grid take the value at the grid's border.
+
+        :param points: Mx3 points
+        :type points: numpy.ndarray
+
+        :param return_gradients: (Default: False) Also return the gradient
+                                 of the interpolated distance
+        :type return_gradients: bool
+
+        :returns: M distances, and Mx3 gradients if return_gradients is set
+        :rtype: numpy.ndarray or (numpy.ndarray, numpy.ndarray)
+        """
+        u = (np.asarray(points, dtype=float) - self.origin) / self.voxel_size
+        u = np.clip(u, 0, self.shape - 1)
+        i = np.minimum(np.floor(u).astype(int), self.shape - 2)
+        f = u - i
+
+        # The eight grid points around each query, as Mx2x2x2
+        x, y, z = i[:, 0], i[:, 1], i[:, 2]
+        corners = np.empty((len(u), 2, 2, 2))
+        for dx in range(2):
+            for dy in range(2):
+                for dz in range(2):
+                    corners[:, dx, dy, dz] = self.distances[x + dx, y + dy,
+                                                            z + dz]
+
+        weights = np.stack((1 - f, f), axis=-1)
+        wx, wy, wz = weights[:, 0], weights[:, 1], weights[:, 2]
+        distances = np.einsum('mijk,mi,mj,mk->m', corners, wx, wy, wz)
+        if not return_gradients:
+            return distances
+
+        slope = np.array([-1.0, 1.0]) / self.voxel_size
+        gradients = np.stack((
+            np.einsum('mijk,i,mj,mk->m', corners, slope, wy, wz),
+            np.einsum('mijk,mi,j,mk->m', corners, wx, slope, wz),
+            np.einsum('mijk,mi,mj,k->m', corners, wx, wy, slope)), axis=-1)
+        return distances, gradients
+
+
+def _metadata_path(path):
+    """The .json file kept next to a saved grid"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _wall_distances(points, dimensions):
+    """Signed distance from points to the walls of a [0, dimensions] room,
+    positive inside the room"""
+    below = -points
+    above = points - dimensions
+    outside = np.maximum(below, 0.0) + np.maximum(above, 0.0)
+    inside = np.min(np.minimum(points, dimensions - points), axis=-1)
+    return np.where(np.any(outside > 0, axis=-1),
+                    -np.sqrt(np.sum(outside ** 2, axis=-1)), inside)
@@ -0,0 +1,91 @@
+"""
+A growable array of rows (positions, joint configurations, ...) recorded
+over time.
+"""
+import numpy as np
+
+
+class TrajectoryBuffer:
+
+    def __init__(self, rows, capacity=64):
+        """Rows are stored in a preallocated array that doubles in size
+        when it fills up, so appending is amortized O(1) instead of
+        copying the whole history every time.
+
+        :param rows: The initial MxD rows
+        :type rows: numpy.ndarray
+
+        :param capacity: (Default: 64) Number of rows to make room for
+        :type capacity: int
+
+        :rtype: None
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        self.data = np.empty((max(capacity, len(rows)), rows.shape[1]))
+        self.size = 0
+        self.extend(rows)
+
+    def __len__(self):
+        return self.size
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.array, dtype=dtype)
+
+    @property
+    def array(self):
+        """Read only view of the rows recorded so far"""
+        view = self.data[:self.size]
+        view.flags.writeable = False
+        return view
+
+    def append(self, row):
+        """Record one row
+
+        :param row: The row to add
+        :type row: numpy.ndarray
+
+        :rtype: None
+        """
+        if self.size == len(self.data):
+            self._grow(self.size + 1)
+        self.data[self.size] = row
+        self.size += 1
+
+    def extend(self, rows):
+        """Record many rows at once
+
+        :param rows: MxD rows to add
+        :type rows: numpy.ndarray
+
+        :rtype: None
+        """
+        rows = np.asarray(rows, dtype=float)
+        if rows.ndim != 2:
+            rows = rows.reshape((-1, self.data.shape[1]))
+        if self.size + len(rows) > len(self.data):
+            self._grow(self.size + len(rows))
+        self.data[self.size:self.size + len(rows)] = rows
+        self.size += len(rows)
+
+    def reset(self, rows):
+        """Replace everything recorded so far. The rows go into new
+        storage, so arrays handed out earlier keep their contents.
+
+        :param rows: The new MxD rows
+        :type rows: numpy.ndarray
+
+        :rtype: None
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        self.data = np.empty((max(len(self.data), len(rows)), rows.shape[1]))
+        self.size = 0
+        self.extend(rows)
+
+    def _grow(self, needed):
+        """Double the storage until it holds at least needed rows"""
+        capacity = max(len(self.data), 1)
+        while capacity < needed:
+            capacity *= 2
+        data = np.empty((capacity, self.data.shape[1]))
+        data[:self.size] = self.data[:self.size]
+        self.data = data
@@ -0,0 +1,97 @@
+import unittest
+import numpy as np
+from maddux.objects import Obstacle, ObstacleSet
+from maddux.robots.arm import Arm
+from maddux.robots.link import Link
+from maddux.robots.predefined_robots import simple_human_arm
+
+
+class InCollisionBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.arm = simple_human_arm(2.0, 2.0, np.zeros(7),
+                                    np.array([2.0, 2.0, 0.0]))
+        self.Q = np.random.RandomState(0).uniform(-np.pi, np.pi, (20, 7))
+
+    def check_no_pairs(self, obstacles):
+        collides, pairs = self.arm.in_collision_batch(self.Q, obstacles,
+                                                      return_pairs=True)
+        self.assertFalse(collides.any())
+        self.assertTrue((pairs == -1).all())
+
+    def test_no_obstacles(self):
+        self.check_no_pairs(ObstacleSet([]))
+        self.check_no_pairs([])
+
+    def test_all_obstacles_pruned(self):
+        self.check_no_pairs([Obstacle([50, 50, 50], [51, 51, 51])])
+
+    def test_pairs_match_mask(self):
+        obstacles = [Obstacle([50, 50, 50], [51, 51, 51]),
+                     Obstacle([1, 1, 0], [3, 3, 3])]
+        collides, pairs = self.arm.in_collision_batch(self.Q, obstacles,
+                                                      return_pairs=True)
+        self.assertTrue(collides.any())
+        self.assertTrue((pairs[collides, 1] == 1).all())
+        self.assertTrue((pairs[~collides] == -1).all())
+
+
+class InCollisionBetweenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.arm = simple_human_arm(2.0, 2.0, np.zeros(7),
+                                    np.array([3.0, 3.0, 1.0]))
+        self.q0 = np.zeros(7)
+        self.q1 = np.array([np.pi / 2, 0, 0, 0, 0, 0, 0])
+
+    def test_thin_wall_between_endpoints(self):
+        # The arm sweeps through the wall, but clears it at both ends
+        wall = [Obstacle([4.0, 3.5, 2.5], [4.05, 4.5, 3.5])]
+        Q = np.array([self.q0, self.q1])
+        self.assertFalse(self.arm.in_collision_batch(Q, wall).any())
+        collides, t = self.arm.in_collision_between(self.q0, self.q1, wall,
+                                                    return_time=True)
+        self.assertTrue(collides)
+        self.assertTrue(0 < t < 1)
+
+    def test_free_motion(self):
+        far = [Obstacle([8.0, 8.0, 8.0], [9.0, 9.0, 9.0])]
+        self.assertFalse(self.arm.in_collision_between(self.q0, self.q1, far))
+        self.assertFalse(self.arm.in_collision_between(self.q0, self.q1, []))
+
+
+class InSelfCollisionBatchTest(unittest.TestCase):
+
+    def check_no_pairs(self, arm):
+        Q = np.random.RandomState(0).uniform(-np.pi, np.pi,
+                                             (20, arm.num_links))
+        collides, pairs = arm.in_self_collision_batch(Q, return_pairs=True)
+        self.assertFalse(collides.any())
+        self.assertTrue((pairs == -1).all())
+
+    def test_two_links(self):
+        links = np.array([Link(0, 1, 0, 1.571), Link(0, 0, 1, 0)])
+        self.check_no_pairs(Arm(links, np.zeros(2), 'two'))
+
+    def test_every_pair_filtered(self):
+        links = np.array([Link(0, 1, 0, 1.571), Link(0, 0, 1, 0),
+                          Link(0, 0, 1, 0)])
+        arm = Arm(links, np.zeros(3), 'three')
+        arm.self_collision_filter = np.zeros((3, 3), dtype=bool)
+        self.check_no_pairs(arm)
+
+    def test_pairs_match_mask(self):
+        # The last link folds back onto the first one
+        links = np.array([Link(0, 0, 1, 0), Link(0, 0, 1, 0),
+                          Link(0, 0, 1, 0)])
+        arm = Arm(links, np.zeros(3), 'fold')
+        arm.self_collision_filter = np.zeros((3, 3), dtype=bool)
+        arm.self_collision_filter[0, 2] = True
+        Q = np.array([[0, 0, 0], [0, 2.5, 2.5]])
+        collides, pairs = arm.in_self_collision_batch(Q, return_pairs=True)
+        self.assertEqual(list(collides), [False, True])
+        self.assertEqual(pairs.tolist(), [[-1, -1], [0, 2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
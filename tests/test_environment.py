@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from maddux.environment import Environment
+from maddux.objects import Ball, Obstacle, ObstacleSet
+
+
+class StaticObjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.box = Obstacle([1, 1, 0], [2, 2, 1])
+        self.env = Environment(static_objects=[self.box])
+        self.inside = np.array([[5.5, 5.5, 0.5]])
+
+    def test_appended_obstacle(self):
+        self.assertFalse(self.env.hits(self.inside)[0])
+        self.env.static_objects.append(Obstacle([5, 5, 0], [6, 6, 1]))
+        self.assertTrue(self.env.hits(self.inside)[0])
+        self.env.static_objects.pop()
+        self.assertFalse(self.env.hits(self.inside)[0])
+
+    def test_moved_obstacle(self):
+        self.assertFalse(self.env.hits(self.inside)[0])
+        self.box.pt1 = np.array([5, 5, 0])
+        self.box.pt2 = np.array([6, 6, 1])
+        self.assertTrue(self.env.hits(self.inside)[0])
+        self.assertFalse(self.env.hits([[1.5, 1.5, 0.5]])[0])
+
+    def test_moved_obstacle_in_grid(self):
+        obstacles = ObstacleSet([self.box], np.array([10.0, 10.0, 10.0]),
+                                cell_size=1.0)
+        self.box.pt2 = np.array([6, 6, 1])
+        self.assertEqual(list(obstacles.candidates(self.inside[0],
+                                                   self.inside[0])), [0])
+
+
+class DynamicObjectsTest(unittest.TestCase):
+
+    def thrown_ball(self):
+        ball = Ball(np.array([2.0, 5.0, 1.0]), 0.1)
+        ball.throw(np.array([3.0, 0.0, 4.0]))
+        return ball
+
+    def test_appended_ball_steps(self):
+        env = Environment()
+        ball = self.thrown_ball()
+        env.dynamic_objects.append(ball)
+        env.step()
+        self.assertAlmostEqual(ball.position[0], 2.003)
+        self.assertEqual(len(ball.positions), 2)
+
+    def test_appended_ball_modes_agree(self):
+        landings = []
+        for analytic in (False, True):
+            env = Environment()
+            ball = self.thrown_ball()
+            env.dynamic_objects.append(ball)
+            events = env.run(5.0, analytic=analytic)
+            self.assertEqual(len(events), 1)
+            self.assertIs(events[0].obj, ball)
+            landings.append(np.array(ball.position))
+        self.assertTrue(np.allclose(landings[0], landings[1], atol=0.01))
+
+    def test_removed_ball_keeps_state(self):
+        ball = self.thrown_ball()
+        env = Environment(dynamic_objects=[ball])
+        env.step()
+        env.dynamic_objects.remove(ball)
+        env.step()
+        self.assertIsNone(ball.array)
+        self.assertEqual(len(ball.positions), 2)
+        self.assertAlmostEqual(ball.position[0], 2.003)
+
+
+if __name__ == '__main__':
+    unittest.main()
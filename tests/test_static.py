@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from maddux.environment import Environment
+from maddux.objects.static import StaticObject
+from maddux.sdf import SignedDistanceField
+
+
+class Column(StaticObject):
+    """A static object implementing only the original interface"""
+
+    def is_hit(self, position):
+        return bool(np.linalg.norm(np.asarray(position)[:2] - 5.0) < 1.0)
+
+    def display(self):
+        pass
+
+    def plot(self, ax):
+        pass
+
+
+class LegacyStaticObjectTest(unittest.TestCase):
+
+    def test_signed_distances_raises(self):
+        self.assertRaises(NotImplementedError, Column().signed_distances,
+                          np.zeros((1, 3)))
+
+    def test_capsules(self):
+        hits = Column().is_hit_by_capsules(np.array([[3.0, 5.0, 1.0],
+                                                     [3.0, 1.0, 1.0]]),
+                                           np.array([[7.0, 5.0, 1.0],
+                                                     [7.0, 1.0, 1.0]]), 0.1)
+        self.assertEqual(list(hits), [True, False])
+
+    def test_signed_distance_field(self):
+        env = Environment(dimensions=[10.0, 10.0, 4.0],
+                          static_objects=[Column()])
+        sdf = SignedDistanceField.build(env, voxel_size=0.5)
+        self.assertLessEqual(sdf.distances[12, 12, 4], 0.0)
+        self.assertGreater(sdf.distances[4, 12, 4], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()